@@ -1,26 +1,22 @@
+import os
 import streamlit as st
-import pandas as pd
-import preprocessor
-import helper
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.figure_factory as ff
-import gdown
+import figures
+import instrument
+import prefetch
+import sections
 
-# Google Drive file URLs
-athlete_events_url = 'https://drive.google.com/uc?id=1WDMrZ0Steqk2lcbf9gYa70Iy8ub1Laxr'
-region_df_url = 'https://drive.google.com/uc?id=11fbDnfL18kcPHX36p9aLz_opAqoYeK_s'
+# Started first so the reported times cover the whole run
+timer = sections.PageTimer()
+# Collect the timed spans of this run for the profiling panel (see instrument.py)
+instrument.start_run()
 
-# Download the CSV files from Google Drive
-gdown.download(athlete_events_url, 'athlete_events.csv', quiet=False)
-gdown.download(region_df_url, 'noc_regions.csv', quiet=False)
+# The chart libraries are imported by the pages that draw with them (seaborn
+# alone takes about a second to import), and the heatmaps import matplotlib in
+# figures.py only when they are not in the figure cache.
 
-# Load Data
-df = pd.read_csv("athlete_events.csv")
-region_df = pd.read_csv("noc_regions.csv")
-
-df = preprocessor.preprocess(df, region_df)
+# The data is loaded on first use by the sections below (see sections.py):
+# downloading the CSVs is skipped when the local copies are unchanged, and the
+# preprocessed frame and everything derived from it are memoized per process
 
 # Sidebar and Layout
 st.sidebar.image('olympicslogo.jpg', width=200)
@@ -65,13 +61,11 @@ st.markdown("""
 # Medal Tally Section
 if user_menu == 'Medal Tally':
     st.sidebar.header("Medal Tally 🏅")
-    years, country = helper.country_year_list(df)
+    years, country = sections.get('years_countries')
 
     selected_year = st.sidebar.selectbox("Select Year", years)
     selected_country = st.sidebar.selectbox("Select Country", country)
 
-    medal_tally = helper.fetch_medal_tally(df, selected_year, selected_country)
-
     if selected_year == 'Overall' and selected_country == 'Overall':
         st.markdown('<div class="main-title">Overall Medal Tally 🌍</div>', unsafe_allow_html=True)
     elif selected_year != 'Overall' and selected_country == 'Overall':
@@ -82,107 +76,115 @@ if user_menu == 'Medal Tally':
         st.markdown(f'<div class="main-title">{selected_country} Performance in {selected_year} Olympics 🎉</div>',
                     unsafe_allow_html=True)
 
-    st.table(medal_tally)
+    with sections.section(timer, ('medal_tally', selected_year, selected_country)) as (slot, medal_tally):
+        slot.table(medal_tally)
 
 # Overall Analysis Section
 if user_menu == 'Overall Analysis':
-    editions = df['Year'].unique().shape[0] - 1
-    cities = df['City'].unique().shape[0]
-    sports = df['Sport'].unique().shape[0]
-    events = df['Event'].unique().shape[0]
-    athletes = df['Name'].unique().shape[0]
-    nations = df['region'].unique().shape[0]
+    import plotly.express as px
 
     st.markdown('<div class="main-title">Top Statistics 📊</div>', unsafe_allow_html=True)
 
-    # Using 3 columns for stats
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown('<div class="stat-header">Editions 🏆</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{editions}</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="stat-header">Hosts 🏙️</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{cities}</div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="stat-header">Sports ⚽</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{sports}</div>', unsafe_allow_html=True)
-
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown('<div class="stat-header">Events 🎉</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{events}</div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="stat-header">Nations 🌏</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{nations}</div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="stat-header">Athletes 👤</div>', unsafe_allow_html=True)
-        st.markdown(f'<div class="stat-number">{athletes}</div>', unsafe_allow_html=True)
+    with sections.section(timer, 'summary') as (slot, stats):
+        with slot.container():
+            # Using 3 columns for stats
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.markdown('<div class="stat-header">Editions 🏆</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["editions"]}</div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown('<div class="stat-header">Hosts 🏙️</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["hosts"]}</div>', unsafe_allow_html=True)
+            with col3:
+                st.markdown('<div class="stat-header">Sports ⚽</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["sports"]}</div>', unsafe_allow_html=True)
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.markdown('<div class="stat-header">Events 🎉</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["events"]}</div>', unsafe_allow_html=True)
+            with col2:
+                st.markdown('<div class="stat-header">Nations 🌏</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["nations"]}</div>', unsafe_allow_html=True)
+            with col3:
+                st.markdown('<div class="stat-header">Athletes 👤</div>', unsafe_allow_html=True)
+                st.markdown(f'<div class="stat-number">{stats["athletes"]}</div>', unsafe_allow_html=True)
 
     # Participating Nations over the Years
     st.markdown('<div class="section-header">Participating Nations Over Time 📈</div>', unsafe_allow_html=True)
-    nations_over_time = helper.data_over_time(df, 'region')
-    fig = px.line(nations_over_time, x='Edition', y='region', title="Nations Participating Over the Years")
-    st.plotly_chart(fig)
+    with sections.section(timer, 'nations_over_time') as (slot, nations_over_time):
+        fig = px.line(nations_over_time, x='Edition', y='region', title="Nations Participating Over the Years")
+        slot.plotly_chart(fig)
 
     # Events over time
     st.markdown('<div class="section-header">Events Over Time 📅</div>', unsafe_allow_html=True)
-    events_over_time = helper.data_over_time(df, 'Event')
-    fig = px.line(events_over_time, x='Edition', y='Event', title="Events Over the Years")
-    st.plotly_chart(fig)
+    with sections.section(timer, 'events_over_time') as (slot, events_over_time):
+        fig = px.line(events_over_time, x='Edition', y='Event', title="Events Over the Years")
+        slot.plotly_chart(fig)
 
     # Number of Events over Time (Every Sport) - Heatmap
     st.markdown('<div class="section-header">Number of Events over Time (Every Sport) 📊</div>', unsafe_allow_html=True)
-    fig, ax = plt.subplots(figsize=(20, 20))
-    x = df.drop_duplicates(subset=['Year', 'Sport', 'Event'])
-    pivot_table = x.pivot_table(index='Sport', columns='Year', values='Event', aggfunc='count').fillna(0).astype(int)
-    sns.heatmap(pivot_table, annot=True, fmt="d", cmap="YlOrBr", linewidths=0.5, ax=ax)
-    st.pyplot(fig)
+    with sections.section(timer, 'df', 'version', name='events_heatmap') as (slot, df, data_version):
+        png, hit, seconds = figures.events_heatmap(df, data_version)
+        with slot.container():
+            st.image(png)
+            if hit:
+                st.caption(f"Served from the figure cache, saving {seconds:.1f}s of rendering")
 
     # Most Successful Athletes
     st.markdown('<div class="section-header">Most Successful Athletes 🏅</div>', unsafe_allow_html=True)
-    sport_list = df['Sport'].unique().tolist()
-    sport_list.sort()
-    sport_list.insert(0, 'Overall')
-    selected_sport = st.selectbox('Select a Sport', sport_list)
-    x = helper.most_successful(df, selected_sport)
-    st.table(x)
+    with sections.section(timer, 'sport_list') as (slot, sport_list):
+        selected_sport = slot.selectbox('Select a Sport', sport_list)
+    with sections.section(timer, ('most_successful', selected_sport)) as (slot, x):
+        slot.table(x)
 
 # Country-Wise Analysis Section
 if user_menu == 'Country-Wise Analysis':
+    import plotly.express as px
+
     st.sidebar.title('Country-Wise Analysis 🌍')
-    country_list = df['region'].dropna().unique().tolist()
-    country_list.sort()
+    country_list = sections.get('country_list')
     selected_country = st.sidebar.selectbox('Select a Country', country_list)
+    if prefetch.enabled():
+        sections.country_viewed(selected_country)
 
     st.markdown(f'<div class="main-title">{selected_country} Medal Tally over the Years 🏅</div>', unsafe_allow_html=True)
-    country_df = helper.yearwise_medal_tally(df, selected_country)
-    fig = px.line(country_df, x='Year', y='Medal Count', title=f"{selected_country} Medal Count Over the Years")
-    st.plotly_chart(fig)
+    with sections.section(timer, ('yearwise_medal_tally', selected_country)) as (slot, country_df):
+        fig = px.line(country_df, x='Year', y='Medal Count', title=f"{selected_country} Medal Count Over the Years")
+        slot.plotly_chart(fig)
 
     st.markdown(f'<div class="section-header">{selected_country} Excels in the Following Sports 🏆</div>',
                 unsafe_allow_html=True)
-    pt = helper.country_event_heatmap(df, selected_country)
-    fig, ax = plt.subplots(figsize=(20, 16))
-    sns.heatmap(pt, annot=True, cmap="YlOrBr", linewidths=0.5, ax=ax)
-    st.pyplot(fig)
+    with sections.section(timer, 'df', 'version', name='country_event_heatmap') as (slot, df, data_version):
+        png, hit, seconds = figures.country_event_heatmap(df, selected_country, data_version)
+        with slot.container():
+            st.image(png)
+            if hit:
+                st.caption(f"Served from the figure cache, saving {seconds:.1f}s of rendering")
 
     st.markdown(f'<div class="section-header">Top 10 Athletes from {selected_country} 🌟</div>', unsafe_allow_html=True)
-    top10_df = helper.most_successful_countrywise(df, selected_country)
-    st.table(top10_df)
+    with sections.section(timer, ('most_successful_countrywise', selected_country)) as (slot, top10_df):
+        slot.table(top10_df)
+
+    # While this country is on screen, compute its neighbours and the most viewed countries in the background
+    if prefetch.enabled():
+        sections.prefetch_countries(selected_country, country_list)
+        stats = sections.country_prefetcher.stats()
+        st.sidebar.caption(f"Prefetch hit rate {stats['hit_rate']:.0%} "
+                           f"({stats.get('hits', 0)} of {stats['requests']} selections)")
 
 # Athlete-Wise Analysis Section
 if user_menu == 'Athlete Wise Analysis':
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
+    import matplotlib.pyplot as plt
+    import plotly.express as px
+    import seaborn as sns
 
     st.markdown('<div class="section-header">Distribution of Age 📊</div>', unsafe_allow_html=True)
-    x1 = athlete_df['Age'].dropna()
-    x2 = athlete_df[athlete_df['Medal'] == 'Gold']['Age'].dropna()
-    x3 = athlete_df[athlete_df['Medal'] == 'Silver']['Age'].dropna()
-    x4 = athlete_df[athlete_df['Medal'] == 'Bronze']['Age'].dropna()
-    fig = ff.create_distplot([x1, x2, x3, x4], ['Overall Age', 'Gold Medalist', 'Silver Medalist', 'Bronze Medalist'],
-                             show_hist=False, show_rug=False)
-    fig.update_layout(autosize=False, width=1000, height=600)
-    st.plotly_chart(fig)
+    with sections.section(timer, 'age_curves', name='age_by_medal') as (slot, curves):
+        fig = figures.density_figure(curves[curves['group'] == 'medal'],
+                                     ['Overall Age', 'Gold Medalist', 'Silver Medalist', 'Bronze Medalist'])
+        fig.update_layout(autosize=False, width=1000, height=600)
+        slot.plotly_chart(fig)
 
     st.markdown('<div class="section-header">Distribution of Age with Respect to Sports (Gold Medalists) 🥇</div>',
                 unsafe_allow_html=True)
@@ -196,28 +198,44 @@ if user_menu == 'Athlete Wise Analysis':
                      'Rugby Sevens',
                      'Beach Volleyball', 'Triathlon', 'Rugby', 'Polo', 'Ice Hockey']
 
-    x = []
-    name = []
-    for sport in famous_sports:
-        temp_df = athlete_df[athlete_df['Sport'] == sport]
-        x.append(temp_df[temp_df['Medal'] == 'Gold']['Age'].dropna())
-        name.append(sport)
-
-    fig = ff.create_distplot(x, name, show_hist=False, show_rug=False)
-    fig.update_layout(autosize=False, width=1000, height=600)
-    st.plotly_chart(fig)
+    with sections.section(timer, 'age_curves', name='age_by_sport') as (slot, curves):
+        fig = figures.density_figure(curves[curves['group'] == 'sport'], famous_sports)
+        fig.update_layout(autosize=False, width=1000, height=600)
+        slot.plotly_chart(fig)
 
     st.markdown('<div class="section-header">Height Vs Weight ⚖️</div>', unsafe_allow_html=True)
-    sport_list = df['Sport'].unique().tolist()
-    sport_list.sort()
-    sport_list.insert(0, 'Overall')
-    selected_sport = st.selectbox('Select a Sport', sport_list)
-    temp_df = helper.weight_v_height(df, selected_sport)
-    fig, ax = plt.subplots()
-    sns.scatterplot(data=temp_df, x='Weight', y='Height', hue='Medal', style='Sex', palette='deep', ax=ax)
-    st.pyplot(fig)
+    with sections.section(timer, 'sport_list') as (slot, sport_list):
+        selected_sport = slot.selectbox('Select a Sport', sport_list)
+    view = st.radio('Show', ['Sample', 'Density'], horizontal=True)
+    with sections.section(timer, 'scatter_data', name='weight_v_height') as (slot, points):
+        fig, ax = plt.subplots()
+        if view == 'Sample':
+            temp_df = points.sample(selected_sport)
+            sns.scatterplot(data=temp_df, x='Weight', y='Height', hue='Medal', style='Sex', palette='deep', ax=ax)
+            shown = f"{len(temp_df):,} of {points.size(selected_sport):,} athletes"
+        else:
+            temp_df = points.density(selected_sport)
+            sns.scatterplot(data=temp_df, x='Weight', y='Height', hue='Medal', size='count', palette='deep', ax=ax)
+            shown = f"{points.size(selected_sport):,} athletes in {len(temp_df):,} cells"
+        with slot.container():
+            st.pyplot(fig)
+            st.caption(f"Showing {shown}")
 
     st.markdown('<div class="section-header">Men vs Women Participation Over the Years 👥</div>', unsafe_allow_html=True)
-    final = helper.men_vs_women(df)
-    fig = px.line(final, x='Year', y=["Male", "Female"], title="Men vs Women Participation Over the Years")
-    st.plotly_chart(fig)
+    with sections.section(timer, 'men_vs_women') as (slot, final):
+        fig = px.line(final, x='Year', y=["Male", "Female"], title="Men vs Women Participation Over the Years")
+        slot.plotly_chart(fig)
+
+# Time to the first finished section and to the end of this run
+first_paint, complete = timer.finish(user_menu)
+st.sidebar.caption(f"First paint {first_paint:.2f}s, page complete {complete:.2f}s")
+
+# Metrics file for a Prometheus textfile collector, when $OLYMPICS_METRICS_FILE is set
+instrument.export()
+
+# Profiling panel: OLYMPICS_DEBUG=1 or ?debug=1 in the URL
+if os.environ.get('OLYMPICS_DEBUG') == '1' or st.query_params.get('debug') == '1':
+    rows, stages = instrument.breakdown(instrument.run_records())
+    with st.sidebar.expander("Profiling (this run)", expanded=True):
+        st.caption(', '.join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in stages.items()))
+        st.dataframe(rows, hide_index=True)
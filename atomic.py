@@ -0,0 +1,20 @@
+import json
+import os
+
+# Atomic file writes: the data goes to a temporary file next to the target,
+# which then replaces it, so a reader sees either the old file or the new one
+# and never half a file. The temporary name carries the process id, so
+# processes writing the same file at once do not clobber each other's.
+
+
+def write_file(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_json(path, value, **options):
+    # options are passed to json.dumps (indent, sort_keys, ...)
+    return write_file(path, json.dumps(value, **options))
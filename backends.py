@@ -0,0 +1,267 @@
+import os
+import weakref
+
+import pandas as pd
+
+import helper
+
+# Interchangeable implementations of the helper functions. Both backends have
+# the methods in FUNCTIONS, with helper.py's signatures minus the frame:
+#   PandasBackend(df)        helper.py on a preprocessed frame (the reference)
+#   DuckDBBackend(directory) SQL over an embedded DuckDB database built from the
+#                            CSVs (and the parts ingest.append added to the
+#                            snapshot) by `python backends.py [data_dir]`
+# The DuckDB tables mirror preprocessor.preprocess and derived.py (Summer rows,
+# region merge, duplicates dropped keeping the first, medal events, first
+# appearance per athlete), so filters and aggregations run inside DuckDB and
+# only the small results come back as DataFrames. Rows the reference leaves in
+# an unspecified order (ties of a sort) are ordered by their key.
+# get(df) picks the backend named by $OLYMPICS_BACKEND ('pandas' by default).
+#
+# benchmarks/compare_backends.py checks the two agree; bench_backends.py times them.
+
+FUNCTIONS = ['fetch_medal_tally', 'medal_tally', 'country_year_list', 'data_over_time', 'top_athletes',
+             'most_successful', 'yearwise_medal_tally', 'events_heatmap', 'country_event_heatmap',
+             'most_successful_countrywise', 'men_vs_women']
+
+DATABASE_FILE = 'olympics.duckdb'
+# Dropdown lists of country_year_list: key -> column
+SUMMARY_COLUMNS = {'years': 'Year', 'countries': 'region'}
+
+
+class PandasBackend:
+    name = 'pandas'
+
+    def __init__(self, df):
+        # A weak reference: the backend is memoized alongside the frame in derived.py
+        self._df = weakref.ref(df)
+
+    def __getattr__(self, name):
+        if name not in FUNCTIONS:
+            raise AttributeError(name)
+        function = getattr(helper, name)
+        return lambda *args, **kwargs: function(self._df(), *args, **kwargs)
+
+
+def database_path(directory):
+    return os.path.join(directory, DATABASE_FILE)
+
+
+def is_available(directory):
+    # A database built from the data `load` currently returns for `directory`
+    # (data_loader.version: the snapshot manifest, or the CSV checksums)
+    import duckdb
+
+    import data_loader
+
+    if not os.path.exists(database_path(directory)):
+        return False
+    with duckdb.connect(database_path(directory), read_only=True) as con:
+        try:
+            stored, = con.execute("SELECT version FROM meta").fetchone()
+        except duckdb.BinderException:
+            # Built before the database recorded the data version
+            return False
+    return stored == data_loader.version(directory)
+
+
+def _appended_parts(directory):
+    # Rows ingest.append added to the snapshot, which the CSVs do not have
+    import snapshot
+
+    if not snapshot.is_available(directory):
+        return []
+    return [snapshot.read_arrow(os.path.join(snapshot.snapshot_dir(directory), part))
+            for part in snapshot.read_manifest(directory)['parts'][1:]]
+
+
+def build(directory):
+    # (Re)create the database from athlete_events.csv and noc_regions.csv, plus
+    # the parts appended to the snapshot
+    import duckdb
+    from pandas._libs.parsers import STR_NA_VALUES
+
+    import data_loader
+
+    path = database_path(directory)
+    version = data_loader.version(directory)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    # The same strings pandas.read_csv reads as missing
+    csv = "read_csv(?, header = true, nullstr = ?, allow_quoted_nulls = true)"
+    nulls = sorted(STR_NA_VALUES)
+    with duckdb.connect(tmp_path) as con:
+        con.execute(f"CREATE TABLE raw AS SELECT * FROM {csv}",
+                    [os.path.join(directory, data_loader.ATHLETE_EVENTS_FILE), nulls])
+        con.execute(f"CREATE TABLE regions AS SELECT * FROM {csv}",
+                    [os.path.join(directory, data_loader.REGIONS_FILE), nulls])
+        columns = [row[0] for table in ('raw', 'regions') for row in con.execute(f"DESCRIBE {table}").fetchall()
+                   if table == 'raw' or row[0] != 'NOC']
+        quoted = ', '.join(f'"{col}"' for col in columns)
+        # rid: position in the CSV, which keeps "the first row" meaning what it does in pandas
+        con.execute(f"""
+            CREATE TABLE events AS
+            SELECT *, Medal = 'Gold' AS Gold, Medal = 'Silver' AS Silver, Medal = 'Bronze' AS Bronze
+            FROM (SELECT raw.rowid AS rid, raw.*, regions.* EXCLUDE (NOC)
+                  FROM raw LEFT JOIN regions USING (NOC) WHERE Season = 'Summer')
+            QUALIFY row_number() OVER (PARTITION BY {quoted} ORDER BY rid) = 1
+            ORDER BY rid""")
+        for part in _appended_parts(directory):
+            # Already preprocessed and deduplicated against the earlier rows; after them in rid order
+            start, = con.execute("SELECT coalesce(max(rid), -1) + 1 FROM events").fetchone()
+            part = part.assign(rid=range(start, start + len(part)))
+            part = part.astype({col: object for col in part.columns
+                                if isinstance(part[col].dtype, pd.CategoricalDtype)})
+            con.register('part', part)
+            con.execute("INSERT INTO events BY NAME SELECT * FROM part")
+            con.unregister('part')
+        con.execute("""
+            CREATE TABLE medal_events AS
+            SELECT * FROM events WHERE Medal IS NOT NULL
+            QUALIFY row_number() OVER (PARTITION BY Team, NOC, Games, Year, City, Sport, Event, Medal
+                                       ORDER BY rid) = 1
+            ORDER BY rid""")
+        con.execute("""
+            CREATE TABLE athletes AS
+            SELECT * FROM events QUALIFY row_number() OVER (PARTITION BY ID ORDER BY rid) = 1 ORDER BY ID""")
+        con.execute("""
+            CREATE TABLE medal_cube AS
+            SELECT region, Year,
+                   count(*) FILTER (WHERE Gold) AS Gold,
+                   count(*) FILTER (WHERE Silver) AS Silver,
+                   count(*) FILTER (WHERE Bronze) AS Bronze,
+                   count(*) FILTER (WHERE Gold OR Silver OR Bronze) AS Total
+            FROM (SELECT DISTINCT region, Year FROM events WHERE region IS NOT NULL) AS participation
+            LEFT JOIN medal_events USING (region, Year)
+            GROUP BY region, Year""")
+        con.execute("DROP TABLE raw")
+        con.execute("CREATE TABLE meta AS SELECT ? AS version", [version])
+    os.replace(tmp_path, path)
+    return path
+
+
+class DuckDBBackend:
+    name = 'duckdb'
+
+    def __init__(self, directory):
+        import duckdb
+
+        self.con = duckdb.connect(database_path(directory), read_only=True)
+        self.columns = {col for col, in self.con.execute("SELECT column_name FROM (DESCRIBE events)").fetchall()}
+
+    def _query(self, sql, params=()):
+        # A cursor per call: a DuckDB connection must not be shared between threads
+        with self.con.cursor() as cursor:
+            return cursor.execute(sql, list(params)).df()
+
+    def _column(self, col):
+        # Column names are spliced into SQL, so only known ones are accepted
+        if col not in self.columns:
+            raise KeyError(col)
+        return f'"{col}"'
+
+    def fetch_medal_tally(self, year, country):
+        where, params, key = [], [], 'region'
+        if year != 'Overall':
+            where.append("Year = ?")
+            params.append(int(year))
+        if country != 'Overall':
+            where.append("region = ?")
+            params.append(country)
+            # A specific country is listed by 'Year', otherwise by 'region'
+            key = 'region' if year != 'Overall' else 'Year'
+        return self._query(f"""
+            SELECT {key}, sum(Gold) AS Gold, sum(Silver) AS Silver, sum(Bronze) AS Bronze, sum(Total) AS Total
+            FROM medal_cube {'WHERE ' + ' AND '.join(where) if where else ''}
+            GROUP BY {key} ORDER BY Gold DESC, {key}""", params).astype({medal: 'int64' for medal in
+                                                                          ['Gold', 'Silver', 'Bronze', 'Total']})
+
+    def medal_tally(self):
+        return self.fetch_medal_tally('Overall', 'Overall')
+
+    def country_year_list(self):
+        lists = {key: self._query(f"SELECT DISTINCT {col} FROM events WHERE {col} IS NOT NULL ORDER BY {col}")[col]
+                 .tolist() for key, col in SUMMARY_COLUMNS.items()}
+        return ['Overall'] + lists['years'], ['Overall'] + lists['countries']
+
+    def data_over_time(self, col):
+        # Missing values count as one more distinct value, as in drop_duplicates
+        column = self._column(col)
+        return self._query(f"""
+            SELECT Year AS Edition, count(DISTINCT {column}) + (count(*) > count({column}))::INTEGER AS {column}
+            FROM events GROUP BY Year ORDER BY Edition""")
+
+    def top_athletes(self, n=15, sport='Overall', country='Overall', year='Overall', medal='Overall',
+                     columns=('Sport', 'region')):
+        where, params = ["Medal IS NOT NULL"], []
+        for col, value in (('Sport', sport), ('region', country), ('Year', year), ('Medal', medal)):
+            if value != 'Overall':
+                where.append(f"{col} = ?")
+                params.append(int(value) if col == 'Year' else value)
+        details = ''.join(f", athletes.{self._column(col)}" for col in columns)
+        return self._query(f"""
+            WITH counts AS (SELECT ID, count(*) AS n FROM events WHERE {' AND '.join(where)}
+                            GROUP BY ID ORDER BY n DESC, ID LIMIT ?)
+            SELECT athletes.Name, counts.n AS "Medal Count"{details}
+            FROM counts JOIN athletes USING (ID) ORDER BY counts.n DESC, ID""", params + [int(n)])
+
+    def most_successful(self, sport):
+        return self.top_athletes(15, sport=sport)
+
+    def most_successful_countrywise(self, country):
+        return self.top_athletes(10, country=country, columns=('Sport',))
+
+    def yearwise_medal_tally(self, country):
+        return self._query("""
+            SELECT ?::VARCHAR AS Country, Year, count(*) AS "Medal Count"
+            FROM medal_events WHERE region = ? GROUP BY Year ORDER BY Year""", [country, country])
+
+    def events_heatmap(self):
+        counts = self._query("""
+            SELECT Sport, Year, count(Event) AS n FROM (SELECT DISTINCT Year, Sport, Event FROM events)
+            WHERE Sport IS NOT NULL GROUP BY Sport, Year""")
+        return counts.pivot(index='Sport', columns='Year', values='n').sort_index().sort_index(axis=1) \
+            .fillna(0).astype(int)
+
+    def country_event_heatmap(self, country):
+        counts = self._query("""
+            SELECT Sport, Year, count(*) AS n FROM medal_events WHERE region = ? GROUP BY Sport, Year""", [country])
+        if counts.empty:
+            # As the reference: zeros over every sport and year, in order of first appearance
+            sports, years = (self._query(f"SELECT {col} FROM events GROUP BY {col} ORDER BY min(rid)")[col]
+                             for col in ('Sport', 'Year'))
+            return pd.DataFrame(0, index=sports.to_numpy(), columns=years.to_numpy())
+        return counts.pivot(index='Sport', columns='Year', values='n').sort_index().sort_index(axis=1) \
+            .fillna(0).astype('float64')
+
+    def men_vs_women(self):
+        # Athletes per Year of their first appearance, in years with male athletes
+        return self._query("""
+            SELECT Year, count(*) FILTER (WHERE Sex = 'M') AS Male, count(*) FILTER (WHERE Sex = 'F') AS Female
+            FROM athletes GROUP BY Year HAVING Male > 0 ORDER BY Year""")
+
+
+def get(df, directory=None):
+    # The backend named by $OLYMPICS_BACKEND; DuckDB falls back to pandas when
+    # its database is missing or was built from other data
+    import data_loader
+
+    directory = directory or data_loader.data_dir()
+    if os.environ.get('OLYMPICS_BACKEND', 'pandas') == 'duckdb':
+        try:
+            if is_available(directory):
+                return DuckDBBackend(directory)
+        except ImportError:
+            # duckdb is not installed
+            pass
+    return PandasBackend(df)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the DuckDB database of the SQL backend from the CSVs and appended parts.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    args = parser.parse_args()
+    print(build(args.directory))
@@ -0,0 +1,51 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from synthetic import write_dataset  # noqa: E402
+
+# Adding the latest edition to an existing snapshot: a full rebuild of the
+# snapshot against ingest.append of just that edition's rows. The append
+# re-reads only the rows of the editions in the delta.
+
+
+def main(scale=1.0):
+    import ingest
+    import snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        full_dir = os.path.join(directory, 'full')
+        base_dir = os.path.join(directory, 'base')
+        os.makedirs(base_dir)
+        write_dataset(full_dir, scale)
+        shutil.copy(os.path.join(full_dir, 'noc_regions.csv'), base_dir)
+
+        raw = pd.read_csv(os.path.join(full_dir, 'athlete_events.csv'))
+        latest = raw['Year'].max()
+        raw[raw['Year'] != latest].to_csv(os.path.join(base_dir, 'athlete_events.csv'), index=False)
+        delta_path = os.path.join(directory, 'delta.csv')
+        raw[raw['Year'] == latest].to_csv(delta_path, index=False)
+        del raw
+        snapshot.build(base_dir)
+
+        start = time.perf_counter()
+        snapshot.build(full_dir)
+        rebuild = time.perf_counter() - start
+
+        start = time.perf_counter()
+        added = ingest.append(delta_path, base_dir)
+        append = time.perf_counter() - start
+
+        print(f"scale {scale}x, {added} rows appended for {latest}")
+        print(f"full rebuild: {rebuild:6.2f} s")
+        print(f"      append: {append:6.2f} s ({rebuild / append:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
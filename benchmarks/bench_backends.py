@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dataset  # noqa: E402
+
+# Build time of each backend from the CSVs (pandas: read and preprocess;
+# DuckDB: build the database), then per helper function the first call (which
+# on pandas includes building the derived tables it needs) and the median of
+# repeated calls, in milliseconds.
+
+REPEATS = 5
+
+
+def calls(df):
+    import derived
+
+    summary = derived.summary(df)
+    country, year, sport = summary['countries'][len(summary['countries']) // 2], summary['years'][-2], 'Athletics'
+    return [
+        ('fetch_medal_tally', ('Overall', 'Overall')),
+        ('fetch_medal_tally', (year, country)),
+        ('medal_tally', ()),
+        ('country_year_list', ()),
+        ('data_over_time', ('region',)),
+        ('data_over_time', ('Name',)),
+        ('top_athletes', (15, sport, 'Overall', 'Overall', 'Gold')),
+        ('most_successful', ('Overall',)),
+        ('yearwise_medal_tally', (country,)),
+        ('events_heatmap', ()),
+        ('country_event_heatmap', (country,)),
+        ('most_successful_countrywise', (country,)),
+        ('men_vs_women', ()),
+    ]
+
+
+def _time(function, args):
+    start = time.perf_counter()
+    function(*args)
+    first = time.perf_counter() - start
+    runs = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function(*args)
+        runs.append(time.perf_counter() - start)
+    return first * 1000, sorted(runs)[REPEATS // 2] * 1000
+
+
+def main(scale=1.0):
+    import backends
+    import data_loader
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        start = time.perf_counter()
+        # load_csv runs preprocess, which already builds the medal tables, the cube and the summary
+        df = data_loader.load_csv(directory)
+        pandas_build = time.perf_counter() - start
+        start = time.perf_counter()
+        backends.build(directory)
+        duckdb_build = time.perf_counter() - start
+        print(f"scale {scale}x; build: pandas {pandas_build:.2f}s, duckdb {duckdb_build:.2f}s")
+        print(f"{'function':>42}  {'pandas first / median':>22}  {'duckdb first / median':>22}  (ms)")
+        pandas, duckdb = backends.PandasBackend(df), backends.DuckDBBackend(directory)
+        for function, args in calls(df):
+            cells = ['%9.1f / %9.1f' % _time(getattr(backend, function), args) for backend in (pandas, duckdb)]
+            label = f"{function}{args if args else '()'}"
+            print(f"{label[:42]:>42}  {cells[0]:>22}  {cells[1]:>22}")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import procstats  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Time to first paint and to a complete page for every menu option, as
+# recorded by sections.PageTimer, running app.py headless with Streamlit's
+# AppTest. Each option gets a fresh process: the first run (Medal Tally, the
+# default page) includes loading the data, the second opens the option with
+# nothing computed for it yet, the third repeats it with everything memoized.
+
+MENU = ('Medal Tally', 'Overall Analysis', 'Country-Wise Analysis', 'Athlete Wise Analysis')
+
+SETUP = '''
+from streamlit.testing.v1 import AppTest
+import sections
+at = AppTest.from_file(os.path.join({repo!r}, 'app.py'), default_timeout=600)
+at.run()
+at.sidebar.radio[0].set_value({option!r}).run()
+at.run()
+errors = [e.message for e in at.exception]
+'''
+
+
+def main(scale=1.0, snapshot_first=True):
+    import snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        if snapshot_first:
+            snapshot.build(directory)
+        print(f"scale {scale}x, {'snapshot' if snapshot_first else 'csv'}; first paint / complete in seconds")
+        for option in MENU:
+            result = procstats.run('(sections.timings, errors)',
+                                   'import os' + SETUP.format(repo=procstats.REPO, option=option),
+                                   {'OLYMPICS_DATA_DIR': directory})
+            timings, errors = eval(result['result'])
+            runs = [timings.get('Medal Tally', [None])[0]] + timings.get(option, [])[-2:]
+            cells = [f"{run[0]:6.2f} / {run[1]:6.2f}" if run else '     error     ' for run in runs]
+            print(f"{option:>22}: load {cells[0]}  cold {cells[-2] if len(cells) > 2 else '-'}  "
+                  f"warm {cells[-1] if len(cells) > 1 else '-'}" + (f"  ({errors[0][:60]})" if errors else ''))
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -0,0 +1,39 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import procstats  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Peak memory of building the dashboard tables from a synthetic dataset (10x
+# the real one by default): the in-memory path (read_csv + preprocess) against
+# chunked ingestion at a few chunk sizes. Each run is a fresh process. The
+# ingested tables themselves (mostly the one-row-per-athlete table) grow with
+# the data; everything else is bounded by the chunk size.
+
+TABLES_MB = ('round(sum(t.memory_usage(deep=True).sum() for t in {tables}.values() '
+             'if hasattr(t, "memory_usage")) / 2**20)')
+
+
+def main(scale=10.0, chunksizes=(25_000, 100_000, 400_000)):
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        athlete_path = os.path.join(directory, 'athlete_events.csv')
+        region_path = os.path.join(directory, 'noc_regions.csv')
+        print(f"scale {scale}x, {os.path.getsize(athlete_path) / 2**20:.0f} MB of CSV")
+
+        runs = [('in-memory', 'round(data_loader.load_csv().memory_usage(deep=True).sum() / 2**20)',
+                 'import data_loader')]
+        for chunksize in chunksizes:
+            tables = f'ingest.ingest({athlete_path!r}, {region_path!r}, {chunksize})'
+            runs.append((f'chunks of {chunksize}', TABLES_MB.format(tables=tables), 'import ingest'))
+        for label, statement, setup in runs:
+            result = procstats.run(statement, setup, {'OLYMPICS_DATA_DIR': directory})
+            print(f"{label:>20}: {result['seconds']:6.1f} s, peak RSS {result['peak_rss_mb']:7.1f} MB, "
+                  f"result frames {result['result']} MB")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
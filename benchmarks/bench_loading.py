@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_loader  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Cold vs warm data_loader.load() on a synthetic dataset. Runs offline: the CSVs
+# are already present, so fetch() only verifies checksums.
+
+
+def main(scale=1.0, reruns=20):
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+
+        start = time.perf_counter()
+        df = data_loader.load(directory)
+        cold = time.perf_counter() - start
+
+        timings = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            data_loader.load(directory)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        print(f"rows: {len(df)}")
+        print(f"cold load (hash + parse + preprocess): {cold * 1000:.1f} ms")
+        print(f"warm rerun median: {timings[len(timings) // 2] * 1000:.3f} ms, max: {timings[-1] * 1000:.3f} ms")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+import preprocessor  # noqa: E402
+from synthetic import make_athlete_events, make_regions  # noqa: E402
+
+# Memory report for preprocessor.apply_schema: resident size per column of the
+# preprocessed frame with the pandas-inferred dtypes vs the compact schema, and
+# the time of the dedup/groupby operations the helpers run on it.
+
+MEDAL_KEY = ['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal']
+
+
+def legacy_preprocess(df, region_df):
+    # preprocessor.preprocess before the compact schema
+    df = df[df['Season'] == 'Summer']
+    df = df.merge(region_df, on='NOC', how='left')
+    df.drop_duplicates(inplace=True)
+    return pd.concat([df, pd.get_dummies(df['Medal'])], axis=1)
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(scale=1.0):
+    region_df, _, _ = make_regions()
+    raw = make_athlete_events(scale, region_df=region_df)
+    before = legacy_preprocess(raw, region_df)
+    after = preprocessor.apply_schema(before)
+
+    mem_before = before.memory_usage(deep=True, index=False)
+    mem_after = after.memory_usage(deep=True, index=False)
+    print(f"{'column':<10}{'before':>12}{'after':>12}  dtype")
+    for col in after.columns:
+        print(f"{col:<10}{mem_before[col] / 2**20:>10.2f}MB{mem_after[col] / 2**20:>10.2f}MB  "
+              f"{before[col].dtype} -> {after[col].dtype}")
+    total_before, total_after = mem_before.sum(), mem_after.sum()
+    print(f"{'total':<10}{total_before / 2**20:>10.2f}MB{total_after / 2**20:>10.2f}MB  "
+          f"({total_before / total_after:.1f}x smaller)")
+
+    operations = {
+        'medal dedup': lambda df: df.drop_duplicates(subset=MEDAL_KEY),
+        'athlete dedup': lambda df: df.drop_duplicates(subset=['Name', 'region']),
+        'tally groupby': lambda df: df.groupby('region', observed=True)[['Gold', 'Silver', 'Bronze']].sum(),
+        'year/event dedup': lambda df: df.drop_duplicates(['Year', 'Event']),
+    }
+    print()
+    for label, op in operations.items():
+        t_before = best_of(lambda: op(before))
+        t_after = best_of(lambda: op(after))
+        print(f"{label:<18}{t_before * 1000:>9.1f} ms{t_after * 1000:>9.1f} ms  ({t_before / t_after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
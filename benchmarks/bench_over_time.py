@@ -0,0 +1,62 @@
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dataset  # noqa: E402
+
+# The over-time series of the dashboards (nations and events per Year, men vs
+# women) computed the old way - one drop_duplicates + groupby per series and
+# two filtered groupbys plus a merge for men vs women - against one call of
+# the timeseries engine, plus the engine on a wider set of columns and the
+# Sex / Season / Medal segments. Nothing is cached between repeats.
+
+COLUMNS = ['region', 'Event', 'Sport', 'City', 'ID']
+SEGMENTS = ['Sex', 'Season', 'Medal']
+
+
+def per_call(df, athlete_df):
+    for col in ('region', 'Event'):
+        df.drop_duplicates(['Year', col]).groupby('Year').size()
+    men = athlete_df[athlete_df['Sex'] == 'M'].groupby('Year')['Name'].count().reset_index()
+    women = athlete_df[athlete_df['Sex'] == 'F'].groupby('Year')['Name'].count().reset_index()
+    men.merge(women, on='Year', how='left').fillna(0)
+
+
+def engine(df, athlete_df):
+    import timeseries
+
+    timeseries.distinct_per_year(df, ['region', 'Event'])
+    timeseries.distinct_per_year(athlete_df, ['ID'], segments=['Sex'], overall=False)
+
+
+def main(scales=(1.0, 10.0), repeat=3):
+    import data_loader
+    import derived
+    import timeseries
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, scale)
+            df = data_loader.load_csv(directory)
+            athlete_df = derived.athletes(df).reset_index()
+            print(f"scale {scale}x, {len(df)} rows")
+            for label, call in (('per-call path', lambda: per_call(df, athlete_df)),
+                                ('engine', lambda: engine(df, athlete_df))):
+                best = min(timeit.repeat(call, number=1, repeat=repeat))
+                print(f"{label:>30}: {best * 1000:8.1f} ms")
+            best = min(timeit.repeat(lambda: timeseries.distinct_per_year(df, COLUMNS, SEGMENTS), number=1,
+                                     repeat=repeat))
+            label = f'engine, {len(COLUMNS)} cols x {len(SEGMENTS) + 1} splits'
+            print(f"{label:>30}: {best * 1000:8.1f} ms")
+            best = min(timeit.repeat(lambda: [df.drop_duplicates(['Year', seg, col]).groupby(['Year', seg], observed=True).size()
+                                              for col in COLUMNS for seg in SEGMENTS], number=1, repeat=repeat))
+            label = 'drop_duplicates, same splits'
+            print(f"{label:>30}: {best * 1000:8.1f} ms (without the All split)")
+            data_loader._frames.clear()
+
+
+if __name__ == '__main__':
+    main(tuple(float(arg) for arg in sys.argv[1:]) or (1.0, 10.0))
@@ -0,0 +1,41 @@
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dataset  # noqa: E402
+
+# Wall time of `precompute.build` (including the heatmap renders) by number of
+# worker processes, and the speedup over one worker. The figure cache is
+# emptied before every run so each one renders everything. Speedup can only
+# grow up to the number of cores; the CPU column is the summed CPU time of the
+# tasks divided by the wall time, i.e. how many cores were kept busy.
+
+
+def main(scale=1.0, counts=None):
+    import figures
+    import precompute
+    import shared
+    import snapshot
+
+    counts = counts or sorted({1, 2, 4, os.cpu_count() or 1})
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        snapshot.build(directory)
+        # Workers attach the shared arrays rather than each reading the snapshot
+        shared.build(directory)
+        print(f"scale {scale}x, {os.cpu_count()} cores")
+        base = None
+        for workers in counts:
+            shutil.rmtree(os.path.join(directory, figures.CACHE_DIR), ignore_errors=True)
+            manifest = precompute.build(directory, workers)
+            base = base or manifest['seconds']
+            print(f"{workers:3d} workers: {manifest['seconds']:7.1f}s  speedup {base / manifest['seconds']:5.2f}x  "
+                  f"cpu {manifest['cpu_seconds'] / manifest['seconds']:5.2f}x  ({manifest['tasks']} tasks)")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0,
+         [int(n) for n in sys.argv[2].split(',')] if len(sys.argv) > 2 else None)
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib  # noqa: E402
+
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+from synthetic import write_dataset  # noqa: E402
+
+# Height vs Weight for the Overall selection: the full athlete table (what the
+# page plotted before) against the stratified sample and the binned density.
+# Reports the rows handed to seaborn, their size and the time to draw and
+# rasterize the plot, at growing dataset sizes.
+
+
+def render(frame, **kwargs):
+    start = time.perf_counter()
+    fig, ax = plt.subplots()
+    sns.scatterplot(data=frame, x='Weight', y='Height', hue='Medal', palette='deep', ax=ax, **kwargs)
+    fig.canvas.draw()
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def main(scales=(1.0, 4.0)):
+    import data_loader
+    import derived
+    import helper
+
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            write_dataset(directory, scale)
+            df = data_loader.load_csv(directory)
+            points = helper.scatter_data(df)
+            full = points.points
+            athletes = derived.athletes(df)
+            print(f"scale {scale}x, {len(athletes)} athletes")
+            for label, frame, kwargs in (('full', full, {'style': 'Sex'}),
+                                         ('sample', points.sample('Overall'), {'style': 'Sex'}),
+                                         ('density', points.density('Overall'), {'size': 'count'})):
+                seconds = render(frame, **kwargs)
+                size = frame.memory_usage(deep=True).sum() / 2**10
+                print(f"{label:>8}: {len(frame):8d} rows, {size:9.0f} KiB, render {seconds:6.2f} s")
+            data_loader._frames.clear()
+
+
+if __name__ == '__main__':
+    main(tuple(float(arg) for arg in sys.argv[1:]) or (1.0, 4.0))
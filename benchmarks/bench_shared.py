@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import procstats  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Host memory of N concurrent processes serving the same data, each loading it
+# either from the snapshot (a private copy per process) or by attaching the
+# arrays published with `python shared.py` (one copy in the page cache,
+# mapped by all of them). Every process runs the helpers the pages call, then
+# waits while its memory is read. Pss splits each shared page between the
+# processes mapping it, so the sum of Pss is what the host actually spends.
+
+CHILD = '''
+import sys
+sys.path.insert(0, {repo!r})
+import helper, shared, snapshot
+df = shared.attach({directory!r}) if {mode!r} == 'shared' else snapshot.read({directory!r})
+# The country with the most gold, so the per-country pages have data
+country = helper.medal_tally(df)['region'].iloc[0]
+helper.fetch_medal_tally(df, 'Overall', country)
+helper.data_over_time(df, 'Event')
+helper.yearwise_medal_tally(df, country)
+helper.country_event_heatmap(df, country)
+helper.most_successful(df, 'Overall')
+helper.events_heatmap(df)
+helper.age_curves(df)
+helper.weight_v_height(df, 'Overall')
+helper.men_vs_women(df)
+print('ready', flush=True)
+sys.stdin.read()
+'''
+
+
+def _memory_kb(pid):
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        fields = dict(line.split()[:2] for line in f if line.split()[0] in ('Rss:', 'Pss:'))
+    return int(fields['Rss:']), int(fields['Pss:'])
+
+
+def measure(directory, mode, processes):
+    code = CHILD.format(repo=procstats.REPO, directory=directory, mode=mode)
+    start = time.perf_counter()
+    children = [subprocess.Popen([sys.executable, '-c', code], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                 text=True, cwd=procstats.REPO) for _ in range(processes)]
+    try:
+        for child in children:
+            if child.stdout.readline().strip() != 'ready':
+                raise RuntimeError(f'{mode} child failed')
+        elapsed = time.perf_counter() - start
+        rss, pss = map(sum, zip(*(_memory_kb(child.pid) for child in children)))
+    finally:
+        for child in children:
+            child.communicate('')
+    return elapsed, rss / 1024, pss / 1024
+
+
+def main(scale=1.0, counts=(1, 2, 4, 8)):
+    import shared
+    import snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        snapshot.build(directory)
+        shared.build(directory)
+        print(f"scale {scale}x; N processes: total RSS / total PSS in MB (seconds until all ready)")
+        for processes in counts:
+            cells = []
+            for mode in ('snapshot', 'shared'):
+                elapsed, rss, pss = measure(directory, mode, processes)
+                cells.append(f"{mode} {rss:8.1f} / {pss:8.1f} ({elapsed:5.2f}s)")
+            print(f"{processes:3d}: " + '   '.join(cells))
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import procstats  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Cold start (fresh interpreter) and peak RSS of the CSV path vs the
+# memory-mapped snapshot. Each measurement runs in its own process.
+
+
+def main(scale=1.0, repeat=3):
+    import snapshot
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        snapshot.build(directory)
+        for label, call in (('csv', 'len(data_loader.load_csv())'), ('snapshot', 'len(data_loader.load())')):
+            results = [procstats.run(call, 'import data_loader', {'OLYMPICS_DATA_DIR': directory})
+                       for _ in range(repeat)]
+            best = min(results, key=lambda r: r['seconds'])
+            print(f"{label:>8}: cold start {best['seconds'] * 1000:7.1f} ms, "
+                  f"peak RSS {best['peak_rss_mb']:6.1f} MB, rows {best['result']}")
+
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0)
@@ -0,0 +1,74 @@
+import ast
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from procstats import REPO, run  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Startup cost, each case in fresh interpreters (median of `repeat` runs):
+#   - the imports at the top of app.py, read from app.py itself so that a new
+#     top-level import shows up here,
+#   - each chart library that pages import when they are opened,
+#   - a cold start to a loaded frame (app imports included) from each source
+#     of the data: the CSVs (read + preprocess), the snapshot and the shared
+#     arrays built by `python warmstart.py`.
+# benchmarks/suite.py runs these too, so they are compared with its baseline.
+#
+#   python benchmarks/bench_startup.py [scale] [repeat]
+
+LIBRARIES = ['plotly.express', 'matplotlib.pyplot', 'seaborn']
+
+
+def app_imports():
+    with open(os.path.join(REPO, 'app.py')) as f:
+        tree = ast.parse(f.read())
+    return '; '.join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def cases(directory):
+    # (label, setup, statement); procstats times both
+    imports = app_imports()
+    yield 'import app modules', imports, 'None'
+    for library in LIBRARIES:
+        yield f'import {library}', f'import {library}', 'None'
+    yield 'cold start: csv', imports + '; import data_loader', f'len(data_loader.load_csv({directory!r}))'
+    yield 'cold start: snapshot', imports + '; import snapshot', f'len(snapshot.read({directory!r}))'
+    yield 'cold start: shared', imports + '; import shared', f'len(shared.attach({directory!r}))'
+
+
+def prepare(directory):
+    # Warm-start artifacts next to the CSVs, unless they are there already
+    import warmstart
+
+    if not warmstart.status(directory)['shared']:
+        warmstart.build(directory)
+
+
+def measure(directory, repeat=3):
+    prepare(directory)
+    results = {}
+    for label, setup, statement in cases(directory):
+        runs = [run(statement, setup) for _ in range(repeat)]
+        results[label] = {'cold_s': statistics.median(r['seconds'] for r in runs), 'warm_s': None,
+                          'peak_rss_mb': statistics.median(r['peak_rss_mb'] for r in runs)}
+    return results
+
+
+def report(results):
+    print(f"{'case':>24} {'seconds':>9} {'peak RSS MB':>12}")
+    for label, m in results.items():
+        print(f"{label:>24} {m['cold_s']:9.3f} {m['peak_rss_mb']:12.1f}")
+
+
+def main(scale=1.0, repeat=3):
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, scale)
+        report(measure(directory, repeat))
+
+
+if __name__ == '__main__':
+    main(*(float(arg) if i == 0 else int(arg) for i, arg in enumerate(sys.argv[1:3])))
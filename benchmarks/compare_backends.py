@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import write_dataset  # noqa: E402
+
+# Checks that the DuckDB backend returns what helper.py returns, for every
+# function in backends.FUNCTIONS over a grid of years, countries, sports and
+# medals (including values with no rows). Results are compared as values:
+# categoricals as their labels, numbers whatever their width, and rows the
+# reference leaves in an unspecified order (ties of a sort) in a fixed order.
+#
+#   python benchmarks/compare_backends.py [scale | data_dir]
+# With a scale the check runs twice: on a synthetic dataset, and on the same
+# dataset with its latest edition added to the snapshot by ingest.append (so
+# the rows are not in the CSVs). Exits with status 1 and lists the differing
+# calls if there are any.
+
+# function -> columns whose ties pandas may order arbitrarily (the sort key first)
+TIED = {'fetch_medal_tally': ['Gold'], 'medal_tally': ['Gold']}
+
+
+def normalize(result, function):
+    if isinstance(result, tuple):
+        return tuple(normalize(part, function) for part in result)
+    if isinstance(result, list):
+        return [value.item() if isinstance(value, np.generic) else value for value in result]
+    frame = result.copy()
+    frame.index = pd.Index(np.asarray(frame.index, dtype=object), name=frame.index.name)
+    frame.columns = pd.Index(np.asarray(frame.columns, dtype=object), name=frame.columns.name)
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype) or frame[col].dtype == object:
+            frame[col] = frame[col].astype(object).where(frame[col].notna(), None)
+        elif frame[col].dtype.kind in 'iub' or pd.api.types.is_integer_dtype(frame[col].dtype):
+            frame[col] = frame[col].astype('float64')
+    if function in TIED and len(frame):
+        key = [col for col in frame.columns if col not in TIED[function]][0]
+        frame = frame.sort_values([TIED[function][0], key], ascending=[False, True], kind='stable')
+        frame = frame.reset_index(drop=True)
+    return frame
+
+
+def equal(left, right):
+    if isinstance(left, tuple):
+        return all(equal(a, b) for a, b in zip(left, right)) and len(left) == len(right)
+    if isinstance(left, list):
+        return left == right
+    try:
+        pd.testing.assert_frame_equal(left, right, check_dtype=False, check_index_type=False,
+                                      check_column_type=False, check_names=False)
+        return True
+    except AssertionError:
+        return False
+
+
+def cases(df):
+    import derived
+
+    summary = derived.summary(df)
+    countries = summary['countries'][::max(1, len(summary['countries']) // 12)] + ['Atlantis']
+    years = summary['years'][::4] + [1903]
+    sports = ['Overall'] + summary['sport_list'][::5] + ['Quidditch']
+    yield 'medal_tally', ()
+    yield 'country_year_list', ()
+    yield 'events_heatmap', ()
+    yield 'men_vs_women', ()
+    for col in ['region', 'Event', 'Sport', 'City', 'Name', 'Age', 'Height', 'Year']:
+        yield 'data_over_time', (col,)
+    for year in ['Overall'] + years:
+        for country in ['Overall'] + countries:
+            yield 'fetch_medal_tally', (year, country)
+    for country in countries:
+        yield 'yearwise_medal_tally', (country,)
+        yield 'country_event_heatmap', (country,)
+        yield 'most_successful_countrywise', (country,)
+    for sport in sports:
+        yield 'most_successful', (sport,)
+        for medal in ['Overall', 'Gold', 'Bronze']:
+            yield 'top_athletes', (10, sport, 'Overall', 'Overall', medal)
+    for country in countries[:4]:
+        for year in years[:4]:
+            yield 'top_athletes', (5, 'Overall', country, year)
+    yield 'top_athletes', (0,)
+
+
+def compare(directory):
+    import backends
+    import data_loader
+
+    backends.build(directory)
+    df = data_loader.load(directory)
+    reference, candidate = backends.PandasBackend(df), backends.DuckDBBackend(directory)
+    failures, count = [], 0
+    for function, args in cases(df):
+        count += 1
+        expected = normalize(getattr(reference, function)(*args), function)
+        actual = normalize(getattr(candidate, function)(*args), function)
+        if not equal(expected, actual):
+            failures.append((function, args))
+    for function, args in failures:
+        print(f"DIFFERENT: {function}{args}")
+    print(f"{count - len(failures)} of {count} calls equal")
+    return not failures
+
+
+def write_appended(directory, scale):
+    # A snapshot without the latest edition, which ingest.append then adds
+    import ingest
+    import snapshot
+
+    write_dataset(directory, scale)
+    athlete_path = os.path.join(directory, 'athlete_events.csv')
+    raw = pd.read_csv(athlete_path)
+    latest = raw['Year'].max()
+    delta_path = os.path.join(directory, 'delta.csv')
+    raw[raw['Year'] == latest].to_csv(delta_path, index=False)
+    raw[raw['Year'] != latest].to_csv(athlete_path, index=False)
+    del raw
+    snapshot.build(directory)
+    ingest.append(delta_path, directory)
+
+
+def main(arg='0.2'):
+    if os.path.isdir(arg):
+        return compare(arg)
+    results = []
+    for write in (write_dataset, write_appended):
+        with tempfile.TemporaryDirectory() as directory:
+            write(directory, float(arg))
+            print(f"{write.__name__}:")
+            results.append(compare(directory))
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(*sys.argv[1:2]) else 1)
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Load test for service.py: keeps `concurrency` keep-alive connections busy
+# with a mix of endpoints and reports latency percentiles and throughput.
+# Without --url it starts the service itself on a synthetic dataset.
+#
+#   python benchmarks/load_test.py [--url http://127.0.0.1:8050] [--requests 5000] [--concurrency 32]
+#
+# --revalidate sends If-None-Match with the last ETag seen for a path, which
+# exercises the 304 path.
+
+# Endpoints of the mix; {country}, {other}, {third} and {year} are filled in from
+# the served data (see paths), so every request has rows to compute
+PATHS = [
+    '/medal-tally',
+    '/medal-tally?year={year}',
+    '/medal-tally?country={country}',
+    '/medal-tally?year={year}&country={other}',
+    '/medal-tally/yearly?country={third}',
+    '/top-athletes?sport=Athletics',
+    '/top-athletes?country={other}&n=10',
+    '/top-athletes?sport=Swimming&medal=Gold',
+    '/over-time?col=region',
+    '/over-time?col=Event',
+    '/men-vs-women',
+    '/summary',
+]
+
+
+async def fetch(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        response = await reader.read()
+    finally:
+        writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+async def paths(host, port):
+    # PATHS with the three countries that won the most gold and the latest year
+    # of the data the service has loaded
+    tally = await fetch(host, port, '/medal-tally')
+    summary = await fetch(host, port, '/summary')
+    country, other, third = (quote(row['region']) for row in tally[:3])
+    return [path.format(country=country, other=other, third=third, year=summary['years'][-1]) for path in PATHS]
+
+
+async def client(host, port, queue, latencies, statuses, etags, revalidate):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if revalidate and path in etags:
+                headers += f"If-None-Match: {etags[path]}\r\n"
+            start = time.perf_counter()
+            writer.write((headers + '\r\n').encode())
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+            fields = dict(line.split(': ', 1) for line in head[1:] if ': ' in line)
+            await reader.readexactly(int(fields.get('Content-Length', 0)))
+            latencies.append(time.perf_counter() - start)
+            status = int(head[0].split(' ')[1])
+            statuses[status] = statuses.get(status, 0) + 1
+            if 'ETag' in fields:
+                etags[path] = fields['ETag']
+    finally:
+        writer.close()
+
+
+async def run(host, port, requests, concurrency, revalidate):
+    mix = await paths(host, port)
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(mix[i % len(mix)])
+    latencies, statuses, etags = [], {}, {}
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, latencies, statuses, etags, revalidate)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000  # noqa: E731
+    print(f"{len(latencies)} requests, concurrency {concurrency}, statuses {statuses}")
+    print(f"p50 {pick(0.50):.2f} ms, p99 {pick(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms, "
+          f"{len(latencies) / elapsed:.0f} req/s")
+
+
+async def wait_for(host, port, process, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError('service exited during startup')
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError('service did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--revalidate', action='store_true')
+    parser.add_argument('--scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.url:
+        host, port = args.url.split('//')[-1].rstrip('/').split(':')
+        asyncio.run(run(host, int(port), args.requests, args.concurrency, args.revalidate))
+        return
+
+    from synthetic import write_dataset
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_dataset(directory, args.scale)
+        port = 8057
+        process = subprocess.Popen([sys.executable, os.path.join(REPO, 'service.py'), directory,
+                                    '--port', str(port), '--workers', str(args.workers)],
+                                   stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(wait_for('127.0.0.1', port, process))
+            print('cold (first pass over the endpoints computes every response):')
+            asyncio.run(run('127.0.0.1', port, len(PATHS), 1, False))
+            print('warm:')
+            asyncio.run(run('127.0.0.1', port, args.requests, args.concurrency, args.revalidate))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
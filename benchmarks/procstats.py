@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a statement in a fresh interpreter and reports its wall time and peak
+# RSS, so measurements don't inherit the memory of the benchmark process.
+
+CHILD = '''
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+{setup}
+result = {statement}
+elapsed = time.perf_counter() - start
+try:
+    # VmHWM starts afresh at exec; ru_maxrss can be inherited from the parent
+    with open('/proc/self/status') as f:
+        peak_kb = int(next(line for line in f if line.startswith('VmHWM')).split()[1])
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'seconds': elapsed, 'peak_rss_mb': peak_kb / 1024, 'result': repr(result)[:200]}}))
+'''
+
+
+def run(statement, setup='', env=None):
+    code = CHILD.format(repo=REPO, setup=setup, statement=statement)
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=REPO,
+                         env=dict(os.environ, **(env or {}))).stdout
+    return json.loads(out.strip().splitlines()[-1])
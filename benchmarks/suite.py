@@ -0,0 +1,250 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_startup  # noqa: E402
+from synthetic import write_dataset  # noqa: E402
+
+# Benchmark suite for the hot paths: reading the CSVs, preprocessor.preprocess
+# and the helper.py functions, on synthetic data at several scales (no network
+# access needed). Each scale runs in a fresh interpreter. Per function it records
+#   cold_s       the first call on a freshly preprocessed frame (tables the
+#                function builds lazily are dropped before every cold call)
+#   warm_s       the median of the repeated calls that follow
+#   peak_mb      tracemalloc peak above the memory at the start of a cold call
+#   retained_mb  memory the cold call left allocated (results, lazily built tables)
+#   blocks       net small-object blocks it left allocated (sys.getallocatedblocks)
+#   page_faults  minor page faults during it: pages of fresh memory the call touched
+# CPython has no running count of allocations, so blocks and page faults stand
+# in for it: the first tracks object churn that is kept, the second large buffers.
+# Memory is measured in a separate cold call, since tracing slows the call down.
+# The startup cases of bench_startup.py (imports, cold start from each data
+# source) run once on the 1x dataset, unless --no-startup is given.
+#
+# Results are written as JSON; with a baseline (a results file saved earlier with
+# --save-baseline) every cold_s / warm_s / peak_mb / peak_rss_mb that grew by
+# more than the threshold is flagged, and the exit status is 1.
+#
+#   python benchmarks/suite.py [--scales 1,10,100] [--repeat 5] [--output results.json] [--no-startup]
+#                              [--baseline baseline.json] [--save-baseline] [--threshold 0.25]
+#
+# Generated datasets are kept in benchmarks/.data/ and reused. 100x is ~25M rows:
+# reading and preprocessing it needs about 20GB of memory.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, '.data')
+DEFAULT_BASELINE = os.path.join(HERE, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(HERE, 'results.json')
+COMPARED = ['cold_s', 'warm_s', 'peak_mb', 'peak_rss_mb']
+# Differences below these are noise whatever the ratio
+FLOORS = {'cold_s': 0.005, 'warm_s': 0.005, 'peak_mb': 1.0, 'peak_rss_mb': 5.0}
+
+
+def calls(df):
+    # (label, function) for every helper, with arguments that have data at any scale
+    import derived
+    import helper
+
+    summary = derived.summary(df)
+    tally = helper.medal_tally(df)
+    country = tally['region'].iloc[0]
+    year = summary['years'][-1]
+    return [
+        ('fetch_medal_tally', lambda: helper.fetch_medal_tally(df, 'Overall', 'Overall')),
+        ('fetch_medal_tally/year_country', lambda: helper.fetch_medal_tally(df, year, country)),
+        ('medal_tally', lambda: helper.medal_tally(df)),
+        ('country_year_list', lambda: helper.country_year_list(df)),
+        ('data_over_time/region', lambda: helper.data_over_time(df, 'region')),
+        ('data_over_time/Name', lambda: helper.data_over_time(df, 'Name')),
+        ('top_athletes', lambda: helper.top_athletes(df, 15, sport='Athletics', medal='Gold')),
+        ('most_successful', lambda: helper.most_successful(df, 'Overall')),
+        ('yearwise_medal_tally', lambda: helper.yearwise_medal_tally(df, country)),
+        ('events_heatmap', lambda: helper.events_heatmap(df)),
+        ('country_event_heatmap', lambda: helper.country_event_heatmap(df, country)),
+        ('most_successful_countrywise', lambda: helper.most_successful_countrywise(df, country)),
+        ('weight_v_height', lambda: helper.weight_v_height(df, 'Overall')),
+        ('age_curves', lambda: helper.age_curves(df)),
+        ('men_vs_women', lambda: helper.men_vs_women(df)),
+    ]
+
+
+def _faults():
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+
+
+def _memory(call):
+    # Peak / retained MB, net blocks and page faults of one call
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    blocks, faults = sys.getallocatedblocks(), _faults()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = call()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    faults = _faults() - faults
+    del result
+    gc.collect()
+    return {'peak_mb': (peak - start) / 2**20, 'retained_mb': (current - start) / 2**20,
+            'blocks': sys.getallocatedblocks() - blocks, 'page_faults': faults}
+
+
+def _timed(call):
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def run_scale(directory, repeat):
+    # Runs in the child process: every measurement at one scale
+    import pandas as pd
+
+    import derived
+    import preprocessor
+
+    athlete_path, region_path = (os.path.join(directory, name) for name in ('athlete_events.csv', 'noc_regions.csv'))
+    results = {}
+    frames = {}
+
+    def read():
+        frames['raw'], frames['regions'] = pd.read_csv(athlete_path), pd.read_csv(region_path)
+        return frames['raw']
+
+    results['read_csv'] = {'cold_s': _timed(read), 'warm_s': None, **_memory(read)}
+    raw, regions = frames.pop('raw'), frames.pop('regions')
+    results['preprocess'] = {'cold_s': _timed(lambda: preprocessor.preprocess(raw, regions)), 'warm_s': None,
+                             **_memory(lambda: preprocessor.preprocess(raw, regions))}
+    df = preprocessor.preprocess(raw, regions)
+    del raw
+    # What preprocess builds up front stays; everything else is rebuilt by each cold call
+    eager = list(derived._entry(df))
+
+    for label, call in calls(df):
+        derived.clear(df, eager)
+        cold = _timed(call)
+        warm = statistics.median(_timed(call) for _ in range(repeat))
+        derived.clear(df, eager)
+        results[label] = {'cold_s': cold, 'warm_s': warm, **_memory(call)}
+    results['_rows'] = len(df)
+    return results
+
+
+def dataset(scale):
+    directory = os.path.join(DATA_DIR, f'{scale:g}x')
+    if not os.path.exists(os.path.join(directory, 'noc_regions.csv')):
+        # The regions file is written last, so its presence marks a complete dataset
+        write_dataset(directory, scale)
+    return directory
+
+
+def run(scales, repeat, startup=True):
+    import numpy
+    import pandas
+
+    results = {'meta': {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                        'pandas': pandas.__version__, 'numpy': numpy.__version__, 'machine': platform.platform(),
+                        'cpus': os.cpu_count(), 'repeat': repeat},
+               'scales': {}}
+    for scale in scales:
+        directory = dataset(scale)
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', directory, str(repeat)],
+                             check=True, capture_output=True, text=True).stdout
+        results['scales'][f'{scale:g}x'] = json.loads(out.strip().splitlines()[-1])
+    if startup:
+        results['startup'] = bench_startup.measure(dataset(1), repeat)
+    return results
+
+
+def groups(results):
+    # (label, {function: metrics}) of every scale and of the startup cases
+    yield from results['scales'].items()
+    if 'startup' in results:
+        yield 'startup', results['startup']
+
+
+def _group(results, label):
+    return results.get('startup', {}) if label == 'startup' else results.get('scales', {}).get(label, {})
+
+
+def regressions(results, baseline, threshold):
+    # (scale, function, metric, baseline value, new value) for everything that got worse
+    flagged = []
+    for scale, functions in groups(results):
+        for function, metrics in functions.items():
+            before = _group(baseline, scale).get(function)
+            if function.startswith('_') or not before:
+                continue
+            for metric in COMPARED:
+                old, new = before.get(metric), metrics.get(metric)
+                if old is None or new is None:
+                    continue
+                if new > old * (1 + threshold) and new - old > FLOORS[metric]:
+                    flagged.append((scale, function, metric, old, new))
+    return flagged
+
+
+def report(results):
+    for scale, functions in results['scales'].items():
+        print(f"\n{scale} ({functions['_rows']} rows)")
+        print(f"{'function':>32} {'cold s':>9} {'warm s':>9} {'peak MB':>9} {'kept MB':>9} {'blocks':>9} {'faults':>9}")
+        for function, m in functions.items():
+            if function.startswith('_'):
+                continue
+            warm = f"{m['warm_s']:9.4f}" if m['warm_s'] is not None else f"{'-':>9}"
+            print(f"{function:>32} {m['cold_s']:9.4f} {warm} {m['peak_mb']:9.1f} {m['retained_mb']:9.1f} "
+                  f"{m['blocks']:9d} {m['page_faults']:9d}")
+    if 'startup' in results:
+        print("\nstartup (fresh interpreters, 1x)")
+        bench_startup.report(results['startup'])
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark preprocess and the helper functions on synthetic data.')
+    parser.add_argument('--scales', default='1,10,100')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-startup', dest='startup', action='store_false', help='skip the startup cases')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative growth flagged as a regression')
+    args = parser.parse_args(argv)
+
+    results = run([float(scale) for scale in args.scales.split(',')], args.repeat, args.startup)
+    report(results)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nresults written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("no baseline to compare with (run with --save-baseline)")
+        return 0
+    with open(args.baseline) as f:
+        flagged = regressions(results, json.load(f), args.threshold)
+    for scale, function, metric, old, new in flagged:
+        print(f"REGRESSION {scale} {function} {metric}: {old:.4g} -> {new:.4g} ({new / old - 1:+.0%})")
+    if not flagged:
+        print(f"no regressions against {args.baseline} (threshold {args.threshold:.0%})")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--child']:
+        print(json.dumps(run_scale(sys.argv[2], int(sys.argv[3]))))
+    else:
+        sys.exit(main())
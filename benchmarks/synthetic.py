@@ -0,0 +1,187 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic stand-in for athlete_events.csv / noc_regions.csv with the same
+# columns and the quirks the helpers rely on: team medals shared by several
+# rows, namesakes, Winter rows, unmapped NOCs and exact duplicate rows.
+# scale=1 is roughly the size of the real dataset (~270k rows).
+
+SUMMER_SPORTS = ['Athletics', 'Swimming', 'Gymnastics', 'Rowing', 'Fencing', 'Shooting', 'Boxing', 'Wrestling',
+                 'Cycling', 'Sailing', 'Football', 'Hockey', 'Basketball', 'Water Polo', 'Weightlifting', 'Judo',
+                 'Canoeing', 'Diving', 'Tennis', 'Handball', 'Volleyball', 'Equestrianism', 'Archery', 'Badminton',
+                 'Table Tennis', 'Art Competitions', 'Tug-Of-War', 'Taekwondo', 'Golf', 'Softball', 'Baseball',
+                 'Rhythmic Gymnastics', 'Synchronized Swimming', 'Rugby Sevens', 'Beach Volleyball', 'Triathlon',
+                 'Rugby', 'Polo', 'Modern Pentathlon', 'Trampolining', 'Lacrosse', 'Cricket']
+WINTER_SPORTS = ['Alpine Skiing', 'Biathlon', 'Bobsleigh', 'Cross Country Skiing', 'Figure Skating', 'Ice Hockey',
+                 'Luge', 'Speed Skating', 'Ski Jumping', 'Curling']
+TEAM_SPORTS = {'Football', 'Hockey', 'Basketball', 'Water Polo', 'Handball', 'Volleyball', 'Rowing', 'Softball',
+               'Baseball', 'Rugby Sevens', 'Beach Volleyball', 'Rugby', 'Polo', 'Tug-Of-War', 'Ice Hockey',
+               'Bobsleigh', 'Curling', 'Synchronized Swimming', 'Lacrosse', 'Cricket'}
+
+SUMMER_GAMES = [(1896, 'Athina'), (1900, 'Paris'), (1904, 'St. Louis'), (1906, 'Athina'), (1908, 'London'),
+                (1912, 'Stockholm'), (1920, 'Antwerpen'), (1924, 'Paris'), (1928, 'Amsterdam'),
+                (1932, 'Los Angeles'), (1936, 'Berlin'), (1948, 'London'), (1952, 'Helsinki'), (1956, 'Melbourne'),
+                (1960, 'Roma'), (1964, 'Tokyo'), (1968, 'Mexico City'), (1972, 'Munich'), (1976, 'Montreal'),
+                (1980, 'Moskva'), (1984, 'Los Angeles'), (1988, 'Seoul'), (1992, 'Barcelona'), (1996, 'Atlanta'),
+                (2000, 'Sydney'), (2004, 'Athina'), (2008, 'Beijing'), (2012, 'London'), (2016, 'Rio de Janeiro')]
+WINTER_GAMES = [(1924, 'Chamonix'), (1928, 'Sankt Moritz'), (1932, 'Lake Placid'), (1936, 'Garmisch-Partenkirchen'),
+                (1948, 'Sankt Moritz'), (1952, 'Oslo'), (1956, "Cortina d'Ampezzo"), (1960, 'Squaw Valley'),
+                (1964, 'Innsbruck'), (1968, 'Grenoble'), (1972, 'Sapporo'), (1976, 'Innsbruck'),
+                (1980, 'Lake Placid'), (1984, 'Sarajevo'), (1988, 'Calgary'), (1992, 'Albertville'),
+                (1994, 'Lillehammer'), (1998, 'Nagano'), (2002, 'Salt Lake City'), (2006, 'Torino'),
+                (2010, 'Vancouver'), (2014, 'Sochi')]
+
+FIRST_NAMES = ['John', 'Maria', 'Li', 'Ahmed', 'Anna', 'Carlos', 'Yuki', 'Olga', 'James', 'Fatima', 'Ivan', 'Sofia',
+               'Wei', 'Elena', 'Pierre', 'Aisha', 'Hans', 'Lucia', 'Kenji', 'Ingrid', 'Pedro', 'Nadia', 'Erik',
+               'Chen', 'Paolo', 'Rosa', 'Miguel', 'Eva', 'Tomas', 'Hana']
+LAST_NAMES = ['Smith', 'Garcia', 'Wang', 'Khan', 'Ivanova', 'Silva', 'Tanaka', 'Petrov', 'Johnson', 'Ali',
+              'Muller', 'Rossi', 'Kim', 'Nielsen', 'Dubois', 'Kowalski', 'Novak', 'Santos', 'Sato', 'Larsen',
+              'Fischer', 'Costa', 'Andersson', 'Horvath', 'Popescu', 'Yilmaz', 'Nagy', 'Moreau', 'Jensen', 'Lopez']
+
+
+def make_regions(n_nocs=230):
+    nocs = ['N%03d' % i for i in range(n_nocs)]
+    regions = ['Country %d' % (i % (n_nocs - 25)) for i in range(n_nocs)]  # several NOCs share a region
+    notes = [np.nan] * n_nocs
+    notes[3] = 'Historical NOC'
+    # The last few NOCs are left out of the region table, like SGP in the real file
+    return pd.DataFrame({'NOC': nocs[:-3], 'region': regions[:-3], 'notes': notes[:-3]}), nocs, regions
+
+
+def make_athlete_events(scale=1.0, seed=0, region_df=None, id_offset=0):
+    rng = np.random.default_rng(seed)
+    if region_df is None:
+        region_df, nocs, regions = make_regions()
+    else:
+        nocs = region_df['NOC'].tolist()
+        regions = region_df['region'].tolist()
+    nocs = np.array(nocs + ['N%03d' % (len(nocs) + i) for i in range(3 - (len(nocs) - len(region_df)))],
+                    dtype=object)
+    regions = np.array(regions + ['Unmapped %d' % i for i in range(len(nocs) - len(regions))], dtype=object)
+
+    n_athletes = max(int(110000 * scale), 100)
+    sports = np.array(SUMMER_SPORTS + WINTER_SPORTS, dtype=object)
+    sport_weights = np.concatenate([np.linspace(3, 0.3, len(SUMMER_SPORTS)), np.full(len(WINTER_SPORTS), 0.45)])
+    sport_weights /= sport_weights.sum()
+
+    ids = np.arange(1, n_athletes + 1) + id_offset
+    # A small name pool so that namesakes are common
+    first = rng.integers(0, len(FIRST_NAMES), n_athletes)
+    last = rng.integers(0, len(LAST_NAMES), n_athletes)
+    suffix = rng.integers(0, max(int(3000 * scale), 2), n_athletes)
+    names = np.char.add(np.char.add(np.char.add(np.array(FIRST_NAMES)[first], ' '),
+                                    np.array(LAST_NAMES)[last]), np.char.mod(' %d', suffix)).astype(object)
+    sex = np.where(rng.random(n_athletes) < 0.27, 'F', 'M').astype(object)
+    noc_weights = rng.pareto(1.2, len(nocs)) + 0.05
+    noc_weights /= noc_weights.sum()
+    athlete_noc = rng.choice(len(nocs), n_athletes, p=noc_weights)
+    athlete_sport = rng.choice(len(sports), n_athletes, p=sport_weights)
+    is_winter = athlete_sport >= len(SUMMER_SPORTS)
+    height = np.round(rng.normal(np.where(sex == 'F', 168, 179), 9)).astype(float)
+    weight = np.round(rng.normal(np.where(sex == 'F', 60, 74), 11) * 2) / 2
+
+    # Each athlete competes in 1-4 consecutive editions of their season
+    n_games = rng.choice([1, 2, 3, 4], n_athletes, p=[0.55, 0.25, 0.13, 0.07])
+    first_game = np.where(is_winter, rng.integers(0, len(WINTER_GAMES), n_athletes),
+                          rng.integers(0, len(SUMMER_GAMES), n_athletes))
+    rep = np.repeat(np.arange(n_athletes), n_games)
+    offset = np.arange(len(rep)) - np.repeat(np.cumsum(n_games) - n_games, n_games)
+    n_season_games = np.where(is_winter[rep], len(WINTER_GAMES), len(SUMMER_GAMES))
+    game_idx = np.minimum(first_game[rep] + offset, n_season_games - 1)
+
+    # 1-3 events per edition
+    n_events = rng.choice([1, 2, 3], len(rep), p=[0.7, 0.2, 0.1])
+    rep2 = np.repeat(np.arange(len(rep)), n_events)
+    athlete = rep[rep2]
+    game_idx = game_idx[rep2]
+    winter_row = is_winter[athlete]
+    event_no = rng.integers(0, 12, len(rep2))
+
+    summer_years = np.array([y for y, _ in SUMMER_GAMES])
+    summer_cities = np.array([c for _, c in SUMMER_GAMES], dtype=object)
+    winter_years = np.array([y for y, _ in WINTER_GAMES])
+    winter_cities = np.array([c for _, c in WINTER_GAMES], dtype=object)
+    year = np.where(winter_row, winter_years[np.minimum(game_idx, len(winter_years) - 1)],
+                    summer_years[np.minimum(game_idx, len(summer_years) - 1)])
+    city = np.where(winter_row, winter_cities[np.minimum(game_idx, len(winter_cities) - 1)],
+                    summer_cities[np.minimum(game_idx, len(summer_cities) - 1)])
+    season = np.where(winter_row, 'Winter', 'Summer').astype(object)
+    games = np.char.add(np.char.add(year.astype(str), ' '), season.astype(str)).astype(object)
+
+    sport = sports[athlete_sport[athlete]]
+    gender = np.where(sex[athlete] == 'F', "Women's", "Men's").astype(object)
+    event = np.char.add(np.char.add(np.char.add(np.char.add(sport.astype(str), ' '), gender.astype(str)),
+                                    ' Event '), event_no.astype(str)).astype(object)
+    noc = nocs[athlete_noc[athlete]]
+    team = regions[athlete_noc[athlete]].copy()
+    second_team = rng.random(len(team)) < 0.03
+    team[second_team] = np.char.add(team[second_team].astype(str), '-2').astype(object)
+
+    debut_age = np.clip(np.round(rng.normal(25, 5.5, n_athletes)), 12, 60)
+    age = debut_age[athlete] + 4 * offset[rep2]
+
+    # Medals: team sports share one medal per (Games, Event, Team), everyone else draws independently
+    team_sport = np.isin(sport, list(TEAM_SPORTS))
+    key = pd.util.hash_array(np.char.add(np.char.add(games.astype(str), event.astype(str)), team.astype(str)))
+    draw = np.where(team_sport, (key % 1000) / 1000.0, rng.random(len(rep2)))
+    medal = np.full(len(rep2), np.nan, dtype=object)
+    medal[draw < 0.05] = 'Gold'
+    medal[(draw >= 0.05) & (draw < 0.10)] = 'Silver'
+    medal[(draw >= 0.10) & (draw < 0.15)] = 'Bronze'
+
+    df = pd.DataFrame({
+        'ID': ids[athlete],
+        'Name': names[athlete],
+        'Sex': sex[athlete],
+        'Age': age,
+        'Height': height[athlete],
+        'Weight': weight[athlete],
+        'Team': team,
+        'NOC': noc,
+        'Games': games,
+        'Year': year,
+        'Season': season,
+        'City': city,
+        'Sport': sport,
+        'Event': event,
+        'Medal': medal,
+    })
+    # Sprinkle the missing values the real file has
+    for col, frac in (('Age', 0.035), ('Height', 0.22), ('Weight', 0.23)):
+        df.loc[rng.random(len(df)) < frac, col] = np.nan
+    # ~0.5% exact duplicate rows
+    dupes = df.sample(frac=0.005, random_state=seed)
+    df = pd.concat([df, dupes]).sort_values(['ID', 'Year'], kind='stable').reset_index(drop=True)
+    return df
+
+
+def write_dataset(directory, scale=1.0, seed=0):
+    # Large scales are generated and appended in 1x parts so the generator itself
+    # never holds more than ~1x of rows in memory.
+    os.makedirs(directory, exist_ok=True)
+    region_df, _, _ = make_regions()
+    athlete_path = os.path.join(directory, 'athlete_events.csv')
+    region_path = os.path.join(directory, 'noc_regions.csv')
+    remaining, part, id_offset = scale, 0, 0
+    while remaining > 1e-9:
+        part_scale = min(remaining, 1.0)
+        df = make_athlete_events(part_scale, seed + part, region_df, id_offset)
+        df.to_csv(athlete_path, index=False, mode='w' if part == 0 else 'a', header=part == 0)
+        id_offset = int(df['ID'].max())
+        remaining -= part_scale
+        part += 1
+    region_df.to_csv(region_path, index=False)
+    return athlete_path, region_path
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a synthetic athlete_events/noc_regions pair.')
+    parser.add_argument('directory')
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(write_dataset(args.directory, args.scale, args.seed))
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import atomic
+import instrument
+import precompute
+import preprocessor
+import shared
+import snapshot
+
+# Google Drive file URLs
+athlete_events_url = 'https://drive.google.com/uc?id=1WDMrZ0Steqk2lcbf9gYa70Iy8ub1Laxr'
+region_df_url = 'https://drive.google.com/uc?id=11fbDnfL18kcPHX36p9aLz_opAqoYeK_s'
+
+ATHLETE_EVENTS_FILE = 'athlete_events.csv'
+REGIONS_FILE = 'noc_regions.csv'
+
+# Checksums of the files we last downloaded / verified, stored next to the data
+MANIFEST_FILE = '.data_cache.json'
+
+# (path, size, mtime) -> sha256, so a rerun only pays for a stat() per file
+_file_hashes = {}
+# (athlete sha256, region sha256) -> preprocessed DataFrame
+_frames = {}
+
+
+def data_dir():
+    return os.environ.get('OLYMPICS_DATA_DIR', '.')
+
+
+def file_hash(path):
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        _file_hashes[key] = sha.hexdigest()
+    return _file_hashes[key]
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(directory, manifest):
+    atomic.write_json(os.path.join(directory, MANIFEST_FILE), manifest, indent=2, sort_keys=True)
+
+
+def fetch(url, filename, directory=None):
+    # Returns the sha256 of the local copy, downloading only when it is missing.
+    directory = directory or data_dir()
+    path = os.path.join(directory, filename)
+    manifest = _read_manifest(directory)
+
+    if os.path.exists(path):
+        digest = file_hash(path)
+        if manifest.get(filename) != digest:
+            # A file we did not download ourselves (e.g. copied in for offline use,
+            # or a newer dataset dropped in) - trust it rather than overwrite it
+            manifest[filename] = digest
+            _write_manifest(directory, manifest)
+        return digest
+
+    # Imported here so that offline runs with the files present never need gdown
+    import gdown
+
+    try:
+        with instrument.span('load', 'download'):
+            downloaded = gdown.download(url, path, quiet=False)
+    except Exception:
+        downloaded = None
+    if downloaded is None:
+        raise FileNotFoundError(f"Could not download {filename} and no local copy exists in {directory}")
+
+    digest = file_hash(path)
+    manifest[filename] = digest
+    _write_manifest(directory, manifest)
+    return digest
+
+
+def fetch_all(directory=None):
+    directory = directory or data_dir()
+    athlete_hash = fetch(athlete_events_url, ATHLETE_EVENTS_FILE, directory)
+    region_hash = fetch(region_df_url, REGIONS_FILE, directory)
+    return athlete_hash, region_hash
+
+
+def load_csv(directory=None):
+    # Preprocessed athlete events, memoized per process on the content of both CSVs
+    directory = directory or data_dir()
+    key = fetch_all(directory)
+    if key not in _frames:
+        with instrument.span('load', 'read_csv'):
+            df = pd.read_csv(os.path.join(directory, ATHLETE_EVENTS_FILE))
+            region_df = pd.read_csv(os.path.join(directory, REGIONS_FILE))
+        # Only the latest version is worth keeping in memory
+        _frames.clear()
+        _frames[key] = preprocessor.preprocess(df, region_df)
+    return _frames[key]
+
+
+def version(directory=None):
+    # Identifies the data `load` returns (for caches that outlive the process):
+    # the snapshot manifest if there is a snapshot, the CSV checksums otherwise
+    directory = directory or data_dir()
+    if snapshot.is_available(directory):
+        with open(os.path.join(snapshot.snapshot_dir(directory), snapshot.MANIFEST_FILE), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    return hashlib.sha256(' '.join(fetch_all(directory)).encode()).hexdigest()
+
+
+def load(directory=None):
+    # Prefer the arrays published by `python shared.py` (mapped read-only and
+    # shared by every process on the host), then the memory-mapped snapshot
+    # written by `python snapshot.py`; fall back to downloading and
+    # preprocessing the CSVs when there is neither. The store written by
+    # `python precompute.py` is attached while it matches the data.
+    directory = directory or data_dir()
+    df = _load(directory)
+    precompute.attach(df, directory)
+    return df
+
+
+def _load(directory):
+    if snapshot.is_available(directory):
+        # The manifest is rewritten by every build and append, the first part is not
+        stat = os.stat(os.path.join(snapshot.snapshot_dir(directory), snapshot.MANIFEST_FILE))
+        published = shared.is_available(directory)
+        key = ('shared' if published else 'snapshot', os.path.abspath(directory), stat.st_size, stat.st_mtime_ns)
+        if key not in _frames:
+            try:
+                with instrument.span('load', 'shared' if published else 'snapshot'):
+                    df = shared.attach(directory) if published else snapshot.read(directory)
+            except ImportError:
+                # pyarrow is not installed
+                return load_csv(directory)
+            _frames.clear()
+            _frames[key] = df
+        return _frames[key]
+    return load_csv(directory)
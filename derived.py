@@ -0,0 +1,216 @@
+import weakref
+
+import pandas as pd
+
+import timeseries
+from rowindex import RowIndex
+
+# Tables derived from a preprocessed frame. Each one is built once per frame
+# (eagerly by preprocessor.preprocess, or lazily on first use) and then shared
+# by every helper call on that frame. Entries are keyed by id(df) and dropped
+# when the frame is garbage collected.
+
+MEDAL_KEY = ['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal']
+MEDALS = ['Gold', 'Silver', 'Bronze']
+# Columns whose number of distinct values per Year is precomputed for the over-time charts
+OVER_TIME_COLUMNS = ['region', 'Event']
+
+# Tables with an inverted index (row_index / where) and the columns it covers
+INDEXED_COLUMNS = {
+    'athlete_medals': ['Sport', 'region', 'Year', 'Medal'],
+    'athletes': ['Sport', 'region', 'Year', 'Sex', 'Medal'],
+}
+
+# Top Statistics counted by the summary: distinct values of each column
+SUMMARY_COLUMNS = {'editions': 'Year', 'hosts': 'City', 'sports': 'Sport', 'events': 'Event', 'athletes': 'Name',
+                   'nations': 'region'}
+# Sorted lists of the summary, for the dropdowns
+SUMMARY_LISTS = {'years': 'Year', 'countries': 'region', 'sport_list': 'Sport'}
+
+_tables = {}
+
+
+def _entry(df):
+    key = id(df)
+    if key not in _tables:
+        _tables[key] = {}
+        weakref.finalize(df, _tables.pop, key, None)
+    return _tables[key]
+
+
+def get(df, name, build):
+    entry = _entry(df)
+    if name not in entry:
+        entry[name] = build(df)
+    return entry[name]
+
+
+def put(df, name, table):
+    # Attach a table built elsewhere (e.g. loaded from the snapshot)
+    _entry(df)[name] = table
+
+
+def clear(df, keep=()):
+    # Drop the tables built for df except those named in keep (for benchmarks
+    # that time first calls)
+    entry = _entry(df)
+    for name in [name for name in entry if name not in keep]:
+        del entry[name]
+
+
+def build_medal_events(df):
+    # One row per medal actually awarded: team events list every team member,
+    # so rows are deduplicated on the medal key before counting.
+    medals = df[df['Medal'].notna()].drop_duplicates(subset=MEDAL_KEY)
+    medals = medals[['region', 'Year', 'Sport', 'Event', 'Medal', 'Gold', 'Silver', 'Bronze']]
+    return medals.set_index(['region', 'Year', 'Sport']).sort_index()
+
+
+def build_participation(df):
+    # Every (region, Year) that took part, with or without medals
+    teams = df[['region', 'Year']].dropna().drop_duplicates()
+    teams = teams.astype({'region': object})
+    return teams.sort_values(['region', 'Year']).reset_index(drop=True)
+
+
+def build_athletes(df):
+    return athlete_dimension(df.drop_duplicates('ID'), athlete_medals(df))
+
+
+def athlete_dimension(first_rows, medal_rows):
+    # Athlete dimension: one row per ID with the attributes of the athlete's first
+    # appearance (first_rows) and their medal counts (every medal-winning row counts).
+    athletes = first_rows[['ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Year', 'Sport', 'region', 'Medal']]
+    athletes = athletes.set_index('ID').sort_index()
+    counts = pd.crosstab(medal_rows['ID'], medal_rows['Medal'].astype(object))
+    counts = counts.reindex(index=athletes.index, columns=MEDALS, fill_value=0).astype('int64')
+    athletes = athletes.join(counts)
+    athletes['Medals'] = athletes['Gold'] + athletes['Silver'] + athletes['Bronze']
+    return athletes
+
+
+def build_athlete_medals(df):
+    # Medal-winning rows reduced to integer athlete keys and the filter columns
+    return df.loc[df['Medal'].notna(), ['ID', 'Sport', 'region', 'Year', 'Medal']].reset_index(drop=True)
+
+
+def build_year_counts(df):
+    # Distinct values per Year of each OVER_TIME_COLUMNS column, as a tidy
+    # frame (see timeseries.py)
+    return timeseries.distinct_per_year(df, OVER_TIME_COLUMNS)
+
+
+def distinct(values):
+    # Distinct values as plain Python objects, missing values (counted by
+    # Series.unique() too) as None
+    return {None if pd.isna(value) else getattr(value, 'item', lambda: value)() for value in values}
+
+
+def summary_from(values):
+    # values: column -> set of its distinct values
+    counts = {key: len(values[col]) for key, col in SUMMARY_COLUMNS.items()}
+    # Kept from the original dashboard: the 1906 Intercalated Games are not counted as an edition
+    counts['editions'] -= 1
+    for key, col in SUMMARY_LISTS.items():
+        counts[key] = sorted(values[col] - {None})
+    return counts
+
+
+def merge_summary(summary, new_values):
+    # The summary after adding rows; new_values: column -> its values that were not in the data yet
+    merged = dict(summary)
+    for key, col in SUMMARY_COLUMNS.items():
+        merged[key] += len(new_values[col])
+    for key, col in SUMMARY_LISTS.items():
+        merged[key] = sorted(set(summary[key]) | (new_values[col] - {None}))
+    return merged
+
+
+def build_summary(df):
+    # Top Statistics counts and the sorted year / country / sport lists for the
+    # dropdowns, one unique() per column
+    return summary_from({col: distinct(df[col].unique()) for col in SUMMARY_COLUMNS.values()})
+
+
+def build_medal_cube(df):
+    return medal_cube_from(medal_events(df), participation(df))
+
+
+def medal_cube_from(events, teams):
+    # Gold/Silver/Bronze/Total per (region, Year), including zero rows for every
+    # participation without medals, plus its rollups (see rollup_medal_cube)
+    counts = events.groupby(level=['region', 'Year'], observed=True)[MEDALS].sum()
+    counts.index = pd.MultiIndex.from_arrays(
+        [counts.index.get_level_values('region').astype(object), counts.index.get_level_values('Year')])
+    region_year = counts.reindex(pd.MultiIndex.from_frame(teams), fill_value=0)
+    return rollup_medal_cube(region_year)
+
+
+def merge_medal_cubes(*region_years):
+    # Combine (region, Year) cells counted over separate slices of the data
+    cells = pd.concat(region_years).groupby(level=['region', 'Year']).sum()
+    return rollup_medal_cube(cells[MEDALS])
+
+
+def rollup_medal_cube(region_year):
+    region_year = region_year[MEDALS].astype('int64').sort_index()
+    region_year['Total'] = region_year['Gold'] + region_year['Silver'] + region_year['Bronze']
+    return {
+        'region_year': region_year,
+        # The same cells ordered by Year first, so a single edition is one slice
+        'year_region': region_year.swaplevel().sort_index(),
+        'region': region_year.groupby(level='region').sum(),
+        'year': region_year.groupby(level='Year').sum(),
+        'total': region_year.sum(),
+    }
+
+
+def medal_events(df):
+    return get(df, 'medal_events', build_medal_events)
+
+
+def participation(df):
+    return get(df, 'participation', build_participation)
+
+
+def athletes(df):
+    return get(df, 'athletes', build_athletes)
+
+
+def athlete_medals(df):
+    return get(df, 'athlete_medals', build_athlete_medals)
+
+
+def medal_cube(df):
+    return get(df, 'medal_cube', build_medal_cube)
+
+
+def year_counts(df):
+    return get(df, 'year_counts', build_year_counts)
+
+
+def summary(df):
+    return get(df, 'summary', build_summary)
+
+
+def _indexed_table(df, table):
+    return {'athlete_medals': athlete_medals, 'athletes': athletes}[table](df)
+
+
+def row_index(df, table):
+    # Inverted index of an INDEXED_COLUMNS table on its columns (see rowindex.py)
+    return get(df, table + '_index', lambda df: RowIndex(_indexed_table(df, table), INDEXED_COLUMNS[table]))
+
+
+def where(df, table, **filters):
+    # Rows of an INDEXED_COLUMNS table matching col=value filters, e.g.
+    # where(df, 'athletes', Sex='F', Medal='Gold')
+    return row_index(df, table).take(_indexed_table(df, table), **filters)
+
+
+def select(table, **levels):
+    # Rows of an indexed table matching the given index levels (empty if none do)
+    try:
+        return table.xs(tuple(levels.values()), level=list(levels), drop_level=False)
+    except KeyError:
+        return table.iloc[:0]
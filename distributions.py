@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+# Age density curves for the Athlete Wise Analysis page, computed once per
+# frame instead of fitting a KDE per series on every rerun. Each curve is the
+# Gaussian KDE that plotly's create_distplot draws (scipy's gaussian_kde with
+# Scott's bandwidth), evaluated on a fixed grid over the series' age range.
+# Ages are whole years, so binning athletes by age loses nothing: every curve
+# is a weighted sum over the distinct ages, computed for all series at once.
+
+GRID_POINTS = 500
+# Series of the first chart: name -> the athlete's Medal (None for everyone)
+MEDAL_SERIES = {'Overall Age': None, 'Gold Medalist': 'Gold', 'Silver Medalist': 'Silver',
+                'Bronze Medalist': 'Bronze'}
+CURVE_COLUMNS = ['group', 'name', 'Age', 'density']
+
+
+def binned_kde(counts, ages, grid):
+    # counts[s, a]: athletes of series s aged ages[a]; returns densities[s, grid]
+    n = counts.sum(axis=1)
+    mean = counts @ ages / n
+    var = (counts @ ages ** 2 - n * mean ** 2) / (n - 1)
+    bandwidth = np.sqrt(var) * n ** -0.2
+    z = (grid[None, None, :] - ages[None, :, None]) / bandwidth[:, None, None]
+    kernel = np.exp(-0.5 * z ** 2)
+    return np.einsum('sa,sag->sg', counts, kernel) / (n * bandwidth * np.sqrt(2 * np.pi))[:, None]
+
+
+def age_curves(athletes):
+    # Tidy curves (group, name, Age, density) from the athlete dimension: the
+    # 'medal' group has one curve per MEDAL_SERIES entry, the 'sport' group one
+    # per sport over its gold medalists. Series with fewer than two distinct
+    # ages have no KDE and are left out.
+    athletes = athletes[athletes['Age'].notna()]
+    ages = athletes['Age'].to_numpy(dtype='int64')
+    if not len(ages):
+        return pd.DataFrame(columns=CURVE_COLUMNS)
+    low = ages.min()
+    bins = ages - low
+    n_bins = int(bins.max()) + 1
+    medals = athletes['Medal'].to_numpy(dtype=object)
+
+    rows = [np.bincount(bins if medal is None else bins[medals == medal], minlength=n_bins)
+            for medal in MEDAL_SERIES.values()]
+    names = [('medal', name) for name in MEDAL_SERIES]
+
+    gold = medals == 'Gold'
+    sport_codes, sports = pd.factorize(athletes['Sport'].astype(object), sort=True)
+    by_sport = np.bincount(sport_codes[gold] * n_bins + bins[gold], minlength=len(sports) * n_bins)
+    rows.extend(by_sport.reshape(len(sports), n_bins))
+    names += [('sport', sport) for sport in sports]
+
+    counts = np.array(rows, dtype='float64')
+    keep = (counts > 0).sum(axis=1) >= 2
+    counts = counts[keep]
+    names = [name for name, kept in zip(names, keep) if kept]
+
+    age_values = np.arange(n_bins, dtype='float64') + low
+    grid = np.linspace(age_values[0], age_values[-1], GRID_POINTS)
+    densities = binned_kde(counts, age_values, grid)
+
+    frames = []
+    for (group, name), count, density in zip(names, counts, densities):
+        # Like create_distplot, each curve spans only its own ages
+        present = age_values[count > 0]
+        inside = (grid >= present[0]) & (grid <= present[-1])
+        frames.append(pd.DataFrame({'group': group, 'name': name, 'Age': grid[inside], 'density': density[inside]}))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,132 @@
+import hashlib
+import io
+import json
+import os
+import time
+
+import atomic
+import data_loader
+import instrument
+from cache import LRUCache
+
+# Server-side rendered matplotlib figures, cached as PNG bytes in memory and on
+# disk. Entries are keyed on the dataset version (data_loader.version), the
+# figure and its parameters, so a repeat view skips both the pivot and the
+# render; each entry keeps the time its render took, which is what a hit saves.
+# Figures are drawn on matplotlib.figure.Figure rather than through pyplot,
+# whose figure registry is not thread-safe: they are drawn both by sessions
+# and by the prefetch thread (see prefetch.py).
+
+CACHE_DIR = '.figure_cache'
+# Same resolution st.pyplot renders at
+DPI = 200
+# Bump when a figure's drawing code changes so old images are not served
+FIGURE_VERSION = 1
+
+_memory = LRUCache(maxsize=32)
+
+
+def cache_dir():
+    return os.path.join(data_loader.data_dir(), CACHE_DIR)
+
+
+def figure_key(version, name, params):
+    raw = json.dumps([FIGURE_VERSION, version, name, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=DPI, bbox_inches='tight')
+    return buf.getvalue()
+
+
+def _read(key):
+    path = os.path.join(cache_dir(), key)
+    try:
+        with open(path + '.json') as f:
+            seconds = json.load(f)['render_seconds']
+        with open(path + '.png', 'rb') as f:
+            return f.read(), seconds
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write(key, png, seconds):
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, key)
+    # The image first, so a metadata file always has its image next to it
+    atomic.write_file(path + '.png', png)
+    atomic.write_json(path + '.json', {'render_seconds': seconds})
+
+
+def cached_png(version, name, params, draw):
+    # PNG bytes of the figure draw() returns, whether it came from the cache,
+    # and the render time of the figure (saved when it did)
+    key = figure_key(version, name, params)
+    entry = _memory.get(key)
+    if entry is None:
+        entry = _read(key)
+        if entry is not None:
+            _memory.put(key, entry)
+    if entry is not None:
+        return entry[0], True, entry[1]
+
+    start = time.perf_counter()
+    with instrument.span('render', name):
+        png = to_png(draw())
+    seconds = time.perf_counter() - start
+    _memory.put(key, (png, seconds))
+    try:
+        _write(key, png, seconds)
+    except OSError:
+        # Read-only data directory: keep the in-memory copy only
+        pass
+    return png, False, seconds
+
+
+def density_figure(curves, names):
+    # Line chart of precomputed density curves, drawn like create_distplot
+    # without histogram and rug; names missing from `curves` are skipped
+    import plotly.graph_objects as go
+    from plotly.colors import DEFAULT_PLOTLY_COLORS
+
+    fig = go.Figure()
+    for i, name in enumerate(names):
+        curve = curves[curves['name'] == name]
+        if curve.empty:
+            continue
+        fig.add_trace(go.Scatter(x=curve['Age'], y=curve['density'], mode='lines', name=name, legendgroup=name,
+                                 marker={'color': DEFAULT_PLOTLY_COLORS[i % len(DEFAULT_PLOTLY_COLORS)]}))
+    fig.update_layout(barmode='overlay', hovermode='closest', legend={'traceorder': 'reversed'},
+                      xaxis={'zeroline': False})
+    return fig
+
+
+def events_heatmap(df, version):
+    # Overall Analysis: number of events per Sport and Year
+    def draw():
+        import seaborn as sns
+        from matplotlib.figure import Figure
+        import helper
+
+        fig = Figure(figsize=(20, 20))
+        ax = fig.subplots()
+        sns.heatmap(helper.events_heatmap(df), annot=True, fmt="d", cmap="YlOrBr", linewidths=0.5, ax=ax)
+        return fig
+    return cached_png(version, 'events_heatmap', {}, draw)
+
+
+def country_event_heatmap(df, country, version):
+    # Country-Wise Analysis: medals per Sport and Year for one country
+    def draw():
+        import seaborn as sns
+        from matplotlib.figure import Figure
+        import helper
+
+        fig = Figure(figsize=(20, 16))
+        ax = fig.subplots()
+        sns.heatmap(helper.country_event_heatmap(df, country), annot=True, cmap="YlOrBr", linewidths=0.5, ax=ax)
+        return fig
+    return cached_png(version, 'country_event_heatmap', {'country': country}, draw)
@@ -1,38 +1,47 @@
 import pandas as pd
 import numpy as np
+import derived
+import distributions
+import instrument
+import timeseries
+from leaderboard import Leaderboards
+from scatter import POINT_BUDGET, ScatterData
 
+def _precomputed(df, kind, key):
+    # The result stored by `python precompute.py`, if its store is attached to this frame
+    store = derived.get(df, 'precomputed', lambda df: None)
+    return None if store is None else store.get(kind, key)
+
+
+def _lookup(table, key):
+    # Rows under the first index level `key`, or an empty frame if there are none
+    try:
+        return table.loc[key]
+    except KeyError:
+        return table.iloc[:0].droplevel(0)
+
+
+@instrument.timed('helper')
 def fetch_medal_tally(df, year, country):
-    medal_df = df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'])
-    flag = 0
+    # Medal counts come pre-aggregated from the (region, Year) medal cube
+    cube = derived.medal_cube(df)
     if year == 'Overall' and country == 'Overall':
-        temp_df = medal_df
+        x = cube['region']
     elif year == 'Overall' and country != 'Overall':
-        flag = 1
-        temp_df = medal_df[medal_df['region'] == country]
+        # A specific country is listed by 'Year', otherwise by 'region'
+        x = _lookup(cube['region_year'], country)
     elif year != 'Overall' and country == 'Overall':
-        temp_df = medal_df[medal_df['Year'] == int(year)]
+        x = _lookup(cube['year_region'], int(year))
     else:
-        temp_df = medal_df[(medal_df['Year'] == int(year)) & (medal_df['region'] == country)]
-
-    # If looking for a specific country, group by 'Year', otherwise group by 'region'
-    if flag == 1:
-        x = temp_df.groupby('Year').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Gold', ascending=False).reset_index()
-    else:
-        x = temp_df.groupby('region').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Gold', ascending=False).reset_index()
-
-    # Calculate total medals
-    x['Total'] = x['Gold'] + x['Silver'] + x['Bronze']
+        x = _lookup(cube['year_region'], int(year))
+        x = x[x.index == country]
 
-    # Display the result
-    return x
+    return x.sort_values('Gold', ascending=False).reset_index()
 
 
+@instrument.timed('helper')
 def medal_tally(df):
-    medal_tally = df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'])
-    medal_tally = medal_tally.groupby('region').sum()[['Gold', 'Silver', 'Bronze']].sort_values('Gold',
-                                                                                     ascending=False).reset_index()
-
-    medal_tally['Total'] = medal_tally['Gold'] + medal_tally['Silver'] + medal_tally['Bronze']
+    medal_tally = derived.medal_cube(df)['region'].sort_values('Gold', ascending=False).reset_index()
 
     medal_tally['Gold'] = medal_tally['Gold'].astype('int')
     medal_tally['Silver'] = medal_tally['Silver'].astype('int')
@@ -42,75 +51,112 @@ def medal_tally(df):
     return medal_tally
 
 
+@instrument.timed('helper')
 def country_year_list(df):
-    years = df['Year'].unique().tolist()
-    years.sort()
-    years.insert(0, 'Overall')
-
-    country = np.unique(df['region'].dropna().values).tolist()
-    country.sort()
-    country.insert(0, 'Overall')
-
+    # Sorted lists from the summary built during preprocessing
+    summary = derived.summary(df)
+    years = ['Overall'] + summary['years']
+    country = ['Overall'] + summary['countries']
     return years, country
 
 
+@instrument.timed('helper')
 def data_over_time(df, col):
-    nations_over_time = (
-        df.drop_duplicates(['Year', col])  # Keep unique (Year, region) pairs
-        .groupby('Year')  # Group by Year
-        .size()  # Get the size (count) of each group
-        .reset_index(name= 'counts')  # Reset index and name the count column
-        .sort_values('Year')  # Sort by Year
-    )
-    nations_over_time.rename(columns={'Year': 'Edition', 'counts': col}, inplace=True)
-    return nations_over_time  # Correctly return the processed DataFrame
+    # Distinct values of col per Year; precomputed for derived.OVER_TIME_COLUMNS
+    tidy = derived.year_counts(df) if col in derived.OVER_TIME_COLUMNS else timeseries.distinct_per_year(df, [col])
+    nations_over_time = timeseries.series(tidy, col)[timeseries.ALL].rename_axis('Edition').reset_index(name=col)
+    return nations_over_time
+
+
+@instrument.timed('helper')
+def top_athletes(df, n=15, sport='Overall', country='Overall', year='Overall', medal='Overall',
+                 columns=('Sport', 'region')):
+    # Athletes with the most medal-winning rows under any combination of filters
+    filters = {col: int(value) if col == 'Year' else value
+               for col, value in (('Sport', sport), ('region', country), ('Year', year), ('Medal', medal))
+               if value != 'Overall'}
+    ids = derived.athlete_medals(df)['ID'].to_numpy()
+    if filters:
+        # Positions from the inverted index, intersected across the filters
+        ids = ids.take(derived.row_index(df, 'athlete_medals').rows(**filters))
+
+    # One grouped count per athlete ID
+    ids, counts = np.unique(ids, return_counts=True)
+
+    # Keep everyone tied with the n-th best, then order by count and ID and cut to n
+    # (no rows for n <= 0)
+    n = max(n, 0)
+    if len(counts) > n > 0:
+        threshold = np.partition(counts, len(counts) - n)[len(counts) - n]
+        ids, counts = ids[counts >= threshold], counts[counts >= threshold]
+    order = np.lexsort((ids, -counts))[:n]
+
+    # Add other details like sport, region, etc. from the athlete's first appearance
+    top = derived.athletes(df).loc[ids[order], ['Name'] + list(columns)]
+    top.insert(1, 'Medal Count', counts[order])
+    return top.reset_index(drop=True)
+
+
+@instrument.timed('helper')
+def leaderboards(df):
+    # Cached per-sport / per-country leaderboards for this frame
+    return derived.get(df, 'leaderboards', lambda df: Leaderboards(df, top_athletes))
+
+
+@instrument.timed('helper')
+def most_successful(df, sport):
+    stored = _precomputed(df, 'most_successful', sport)
+    if stored is not None:
+        return stored
+    return leaderboards(df).by_sport(sport, 15)
 
 
-def most_successful(df, sport):
-    # Consider only rows where a medal was awarded
-    temp_df = df.dropna(subset=['Medal'])
+@instrument.timed('helper')
+def yearwise_medal_tally(df, country):
+    stored = _precomputed(df, 'yearwise_medal_tally', country)
+    if stored is not None:
+        return stored
+    # Medal-winning rows of the country, each medal counted once
+    temp_df = derived.select(derived.medal_events(df), region=country)
+    # Count the medals per Year
+    medal_tally = temp_df.groupby(level='Year')['Medal'].count().reset_index()
+    # Rename columns for clarity
+    medal_tally.columns = ['Year', 'Medal Count']
+    medal_tally.insert(0, 'Country', country)
+    return medal_tally
 
-    # Filter by sport if specified
-    if sport != 'Overall':
-        temp_df = temp_df[temp_df['Sport'] == sport]
 
-    # Count medals for each athlete
-    athlete_medal_count = temp_df['Name'].value_counts().reset_index()
-    athlete_medal_count.columns = ['Name', 'Medal Count']  # Rename columns for clarity
+@instrument.timed('helper')
+def events_heatmap(df):
+    # Number of distinct events per Sport (rows) and Year (columns)
+    def build(df):
+        x = df.drop_duplicates(subset=['Year', 'Sport', 'Event'])
+        return x.pivot_table(index='Sport', columns='Year', values='Event', aggfunc='count',
+                             observed=True).fillna(0).astype(int)
+    return derived.get(df, 'events_heatmap', build)
 
-    # Merge to add other details like sport, region, etc., avoiding duplication
-    merged_df = athlete_medal_count.merge(df[['Name', 'Sport', 'region']], on='Name', how='left').drop_duplicates(
-        'Name')
 
-    return merged_df.head(15)
+@instrument.timed('helper')
+def country_event_counts(df, country):
+    # Medal-winning rows of the country, each medal counted once
+    country_df = derived.select(derived.medal_events(df), region=country)
 
+    # Count medals by sport and year for the specific country
+    sport_yearly_medal_count = country_df.groupby(level=['Sport', 'Year'], observed=True)['Medal'].count().reset_index()
 
-def yearwise_medal_tally(df, country):
-    # Consider only rows where a medal was awarded
-    temp_df = df.dropna(subset=['Medal'])
-    # Remove duplicates to ensure each medal is counted only once
-    temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
-    # Group by region (country) and Year, then count the medals
-    medal_tally = temp_df.groupby(['region', 'Year']).count()['Medal'].reset_index()
     # Rename columns for clarity
-    medal_tally.columns = ['Country', 'Year', 'Medal Count']
-    # Replace 'YourCountryName' with the specific country you want to filter for
-    specific_country = country
-    country_medal_tally = medal_tally[medal_tally['Country'] == specific_country]
-    return country_medal_tally
+    sport_yearly_medal_count.columns = ['Sport', 'Year', 'Medal Count']
+    return sport_yearly_medal_count
 
 
+@instrument.timed('helper')
 def country_event_heatmap(df, country):
-    # Consider only rows where a medal was awarded
-    temp_df = df.dropna(subset=['Medal'])
-    # Remove duplicates to ensure each medal is counted only once
-    temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
-
-    # Filter for the specific country
-    country_df = temp_df[temp_df['region'] == country]
+    sport_yearly_medal_count = _precomputed(df, 'country_event_counts', country)
+    if sport_yearly_medal_count is None:
+        sport_yearly_medal_count = country_event_counts(df, country)
 
-    # Check if the filtered DataFrame is empty
-    if country_df.empty:
+    # Check if the country has no medals
+    if sport_yearly_medal_count.empty:
         # Get unique sports and years from the original DataFrame
         unique_sports = df['Sport'].unique()
         unique_years = df['Year'].unique()
@@ -119,50 +165,58 @@ def country_event_heatmap(df, country):
         heatmap_data = pd.DataFrame(0, index=unique_sports, columns=unique_years)
         return heatmap_data
 
-    # Count medals by sport and year for the specific country
-    sport_yearly_medal_count = country_df.groupby(['Sport', 'Year']).count()['Medal'].reset_index()
-
-    # Rename columns for clarity
-    sport_yearly_medal_count.columns = ['Sport', 'Year', 'Medal Count']
-
     # Create a pivot table
     heatmap_data = sport_yearly_medal_count.pivot_table(index='Sport', columns='Year', values='Medal Count',
-                                                        fill_value=0)
+                                                        fill_value=0, observed=True)
     return heatmap_data
 
 
+@instrument.timed('helper')
 def most_successful_countrywise(df, country):
-    # Consider only rows where a medal was awarded
-    temp_df = df.dropna(subset=['Medal'])
+    stored = _precomputed(df, 'most_successful_countrywise', country)
+    if stored is not None:
+        return stored
+    return leaderboards(df).by_country(country, 10).drop(columns='region')
+
+
+@instrument.timed('helper')
+def athlete_table(df):
+    # One row per athlete, identified by ID (namesakes stay separate)
+    return derived.athletes(df)
 
-    temp_df = temp_df[temp_df['region'] == country]
 
-    # Count medals for each athlete
-    athlete_medal_count = temp_df['Name'].value_counts().reset_index()
-    athlete_medal_count.columns = ['Name', 'Medal Count']  # Rename columns for clarity
+@instrument.timed('helper')
+def age_curves(df):
+    # Precomputed age density curves of the athletes (see distributions.py)
+    stored = _precomputed(df, 'age_curves', 'Overall')
+    if stored is not None:
+        return stored
+    return derived.get(df, 'age_curves', lambda df: distributions.age_curves(derived.athletes(df)))
 
-    # Merge to add other details like sport, region, etc., avoiding duplication
-    merged_df = athlete_medal_count.merge(df[['Name', 'Sport']], on='Name', how='left').drop_duplicates(
-        'Name')
 
-    return merged_df.head(10)
+@instrument.timed('helper')
+def scatter_data(df):
+    # Sampled / binned Height vs Weight points for this frame
+    return derived.get(df, 'scatter_data', lambda df: ScatterData(derived.athletes(df)))
 
 
-def weight_v_height(df, sport):
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-    athlete_df['Medal'].fillna('No Medal', inplace=True)
-    if sport != 'Overall':
-        temp_df = athlete_df[athlete_df['Sport'] == sport]
-        return temp_df
-    else :
-        return athlete_df
+@instrument.timed('helper')
+def weight_v_height(df, sport, budget=POINT_BUDGET):
+    # A stratified sample of at most `budget` athletes with both measurements
+    stored = _precomputed(df, 'weight_v_height', sport) if budget == POINT_BUDGET else None
+    if stored is not None:
+        return stored
+    return scatter_data(df).sample(sport, budget)
 
 
+@instrument.timed('helper')
 def men_vs_women(df):
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-    men = athlete_df[athlete_df['Sex'] == 'M'].groupby('Year').count()['Name'].reset_index()
-    women = athlete_df[athlete_df['Sex'] == 'F'].groupby('Year').count()['Name'].reset_index()
-    final = men.merge(women, on='Year', how='left')
-    final.fillna(0, inplace=True)
-    final.rename(columns={'Name_x': 'Male', 'Name_y': 'Female'}, inplace=True)
+    # Athletes per Year of their first appearance, split by Sex
+    athlete_df = derived.athletes(df).reset_index()
+    tidy = timeseries.distinct_per_year(athlete_df, ['ID'], segments=['Sex'], overall=False)
+    by_sex = timeseries.series(tidy, 'ID', 'Sex')
+    # Years with male athletes, as the original left merge of men and women did
+    by_sex = by_sex.reindex(columns=['M', 'F'])
+    by_sex = by_sex[by_sex['M'].notna()].fillna(0).astype('int64')
+    final = by_sex.rename(columns={'M': 'Male', 'F': 'Female'}).rename_axis(columns=None).reset_index()
     return final
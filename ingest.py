@@ -0,0 +1,254 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import derived
+import preprocessor
+import timeseries
+
+# Chunked ingestion of athlete_events.csv for datasets that do not fit in memory.
+# Each chunk is read with explicit dtypes, filtered to the Summer Games and merged
+# with noc_regions, then folded into the tables the dashboards use (see
+# derived.py) without ever holding the whole raw frame. Memory is bounded by
+# the chunk size plus the aggregates themselves (medal rows, one row per athlete,
+# distinct (Year, value) pairs).
+
+CSV_DTYPES = {
+    'ID': 'int32', 'Name': object, 'Sex': object, 'Age': 'float32', 'Height': 'float32', 'Weight': 'float32',
+    'Team': object, 'NOC': object, 'Games': object, 'Year': 'int32', 'Season': object, 'City': object,
+    'Sport': object, 'Event': object, 'Medal': object,
+}
+USECOLS = list(CSV_DTYPES)
+
+
+ATHLETE_COLUMNS = ['ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Year', 'Sport', 'region', 'Medal']
+MEDAL_ROW_COLUMNS = ['ID', 'Sport', 'region', 'Year', 'Medal']
+MEDAL_EVENT_COLUMNS = ['region', 'Year', 'Sport', 'Event', 'Medal']
+
+
+def _row_hashes(frame, columns=None):
+    return pd.util.hash_pandas_object(frame if columns is None else frame[columns], index=False).to_numpy()
+
+
+def _unseen(hashes, seen):
+    # Mask of hashes that are neither in the sorted array `seen` nor repeated earlier
+    # in `hashes`, and the updated `seen`
+    pos = np.searchsorted(seen, hashes)
+    known = seen[np.minimum(pos, len(seen) - 1)] == hashes if len(seen) else np.zeros(len(hashes), dtype=bool)
+    new = ~pd.Series(hashes).duplicated().to_numpy() & ~known
+    added = np.sort(hashes[new])
+    return new, np.insert(seen, np.searchsorted(seen, added), added)
+
+
+def _compact(frame):
+    # Kept parts hold categoricals rather than one Python string per cell
+    return frame.astype({col: 'category' for col in frame.columns if frame[col].dtype == object})
+
+
+def read_chunks(path, region_df, chunksize=100_000):
+    for chunk in pd.read_csv(path, usecols=USECOLS, dtype=CSV_DTYPES, chunksize=chunksize):
+        # Filtering for summer olympics and merging with the regions, as preprocessor.preprocess does
+        chunk = chunk[chunk['Season'] == 'Summer']
+        # Read wide so no year wraps around, then narrowed as preprocess does
+        chunk = chunk.assign(Year=preprocessor.to_integer(chunk['Year'], preprocessor.INTEGER_COLUMNS['Year']))
+        yield chunk.merge(region_df, on='NOC', how='left')
+
+
+class Aggregator:
+    # Folds preprocessed chunks into the derived tables. Exact duplicate rows
+    # (dropped by preprocess) only matter for per-athlete medal counts, so only
+    # medal-winning rows are checked for them.
+
+    def __init__(self):
+        # Sorted row / medal-key hashes of the medal-winning rows kept so far
+        self._medal_rows_seen = np.zeros(0, dtype=np.uint64)
+        self._medal_keys_seen = np.zeros(0, dtype=np.uint64)
+        # Bitmap over athlete IDs
+        self._athlete_ids_seen = np.zeros(0, dtype=bool)
+        self._medal_rows = []
+        self._medal_events = []
+        self._first_rows = []
+        self._pairs = {col: [] for col in derived.OVER_TIME_COLUMNS}
+        self._teams = []
+        self._distinct = {col: set() for col in derived.SUMMARY_COLUMNS.values()}
+        self.rows = 0
+
+    def _new_athletes(self, ids):
+        if len(ids) and ids.max() >= len(self._athlete_ids_seen):
+            grown = np.zeros(max(int(ids.max()) + 1, 2 * len(self._athlete_ids_seen)), dtype=bool)
+            grown[:len(self._athlete_ids_seen)] = self._athlete_ids_seen
+            self._athlete_ids_seen = grown
+        new = ~self._athlete_ids_seen[ids]
+        self._athlete_ids_seen[ids] = True
+        return new
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+
+        medals = chunk[chunk['Medal'].notna()]
+        new_row, self._medal_rows_seen = _unseen(_row_hashes(medals), self._medal_rows_seen)
+        medals = medals[new_row]
+        self._medal_rows.append(_compact(medals[MEDAL_ROW_COLUMNS]))
+
+        # Team medals count once: keep the first row of every medal key
+        first, self._medal_keys_seen = _unseen(_row_hashes(medals, derived.MEDAL_KEY), self._medal_keys_seen)
+        self._medal_events.append(_compact(medals.loc[first, MEDAL_EVENT_COLUMNS]))
+
+        athletes = chunk.drop_duplicates('ID')
+        athletes = athletes[self._new_athletes(athletes['ID'].to_numpy())]
+        self._first_rows.append(_compact(athletes[ATHLETE_COLUMNS]))
+
+        for col in derived.OVER_TIME_COLUMNS:
+            self._pairs[col].append(chunk[['Year', col]].drop_duplicates())
+        self._teams.append(chunk[['region', 'Year']].dropna().drop_duplicates())
+        for col, values in self._distinct.items():
+            values.update(derived.distinct(chunk[col].unique()))
+
+    def tables(self):
+        medal_rows = preprocessor.apply_schema(preprocessor.concat(self._medal_rows)).drop(columns=preprocessor.MEDAL_COLUMNS)
+        events = preprocessor.apply_schema(preprocessor.concat(self._medal_events))
+        events = events.set_index(['region', 'Year', 'Sport']).sort_index()
+        teams = pd.concat(self._teams).drop_duplicates().astype({'region': object})
+        teams = teams.sort_values(['region', 'Year']).reset_index(drop=True)
+        first_rows = preprocessor.apply_schema(preprocessor.concat(self._first_rows))
+
+        year_counts = pd.concat([
+            timeseries.distinct_per_year(pd.concat(self._pairs[col]), [col]) for col in derived.OVER_TIME_COLUMNS
+        ], ignore_index=True)
+
+        return {
+            'medal_events': events,
+            'participation': teams,
+            'medal_cube': derived.medal_cube_from(events, teams),
+            'athlete_medals': medal_rows,
+            'athletes': derived.athlete_dimension(first_rows, medal_rows),
+            'year_counts': year_counts,
+            'summary': derived.summary_from(self._distinct),
+        }
+
+
+def ingest(athlete_path, region_path, chunksize=100_000):
+    region_df = pd.read_csv(region_path)
+    aggregator = Aggregator()
+    for chunk in read_chunks(athlete_path, region_df, chunksize):
+        aggregator.add(chunk)
+    return aggregator.tables()
+
+
+def _replace_years(table, rebuilt, years, index=None):
+    # `table` with the rows of `years` swapped for `rebuilt`
+    if index:
+        table, rebuilt = table.reset_index(), rebuilt.reset_index()
+    kept = table[~table['Year'].isin(years)]
+    merged = preprocessor.concat([kept, rebuilt])
+    return merged.set_index(index).sort_index() if index else merged
+
+
+def fold(tables, rows, new):
+    # Update the derived tables for appended rows. `rows` are all rows of the
+    # editions the append touched (old and new, in frame order), `new` the
+    # appended ones. Every table except the athlete dimension is partitioned by
+    # Year, so only those editions are rebuilt; athletes are rebuilt for the IDs
+    # that appear in `new`.
+    years = rows['Year'].unique()
+    events = derived.build_medal_events(rows)
+    teams = derived.build_participation(rows)
+    medal_rows = derived.build_athlete_medals(rows)
+
+    updated = {
+        'medal_events': _replace_years(tables['medal_events'], events, years, ['region', 'Year', 'Sport']),
+        'participation': _replace_years(tables['participation'], teams, years).sort_values(
+            ['region', 'Year']).reset_index(drop=True).astype({'region': object}),
+        'athlete_medals': _replace_years(tables['athlete_medals'], medal_rows, years),
+    }
+    year_counts = tables['year_counts']
+    year_counts = _replace_years(year_counts, derived.build_year_counts(rows), years)
+    # Back in build order: series as in OVER_TIME_COLUMNS, then Year
+    order = year_counts['series'].astype(object).map({col: i for i, col in enumerate(derived.OVER_TIME_COLUMNS)})
+    updated['year_counts'] = year_counts.iloc[np.lexsort((year_counts['Year'], order))].reset_index(drop=True)
+
+    region_year = tables['medal_cube']['region_year']
+    cells = derived.medal_cube_from(events, teams)['region_year']
+    updated['medal_cube'] = derived.rollup_medal_cube(
+        pd.concat([region_year[~region_year.index.get_level_values('Year').isin(years)], cells]))
+
+    athletes = tables['athletes']
+    touched = new['ID'].unique()
+    known = athletes.index.isin(touched)
+    first_rows = preprocessor.concat([
+        athletes.loc[known, ATHLETE_COLUMNS[1:]].reset_index(),
+        new.drop_duplicates('ID').loc[lambda f: ~f['ID'].isin(athletes.index), ATHLETE_COLUMNS],
+    ])
+    all_medal_rows = updated['athlete_medals']
+    rebuilt = derived.athlete_dimension(first_rows, all_medal_rows[all_medal_rows['ID'].isin(touched)])
+    updated['athletes'] = preprocessor.concat(
+        [athletes[~known].reset_index(), rebuilt.reset_index()]).set_index('ID').sort_index()
+    return updated
+
+
+def append(delta_path, directory):
+    # Append the rows of a delta CSV (e.g. a new edition) to the snapshot in
+    # `directory`. Rows already in the snapshot are skipped, the rest are written
+    # as a new part and the stored derived tables are updated in place, so the
+    # cost follows the size of the delta and the editions it touches rather
+    # than the whole dataset. Returns the number of rows added.
+    import snapshot
+
+    region_df = pd.read_csv(os.path.join(directory, 'noc_regions.csv'))
+    delta = pd.concat(read_chunks(delta_path, region_df), ignore_index=True)
+    existing = snapshot.read_rows(directory, 'Year', delta['Year'].unique())
+    delta = preprocessor.apply_schema(delta.drop_duplicates())[existing.columns]
+
+    rows = preprocessor.concat([existing, delta])
+    new = rows.duplicated(subset=[col for col in rows.columns if col not in preprocessor.MEDAL_COLUMNS])
+    new = ~new.to_numpy() & (np.arange(len(rows)) >= len(existing))
+    if not new.any():
+        return 0
+    rows = rows[(np.arange(len(rows)) < len(existing)) | new].reset_index(drop=True)
+    added = rows.iloc[len(existing):].reset_index(drop=True)
+    # Plain columns keep the dtypes of the existing parts, which must hold the new values
+    for col in existing.columns:
+        if existing[col].dtype.kind in 'iu' and not preprocessor.fits(
+                added[col].dropna().to_numpy(dtype='int64'), existing[col].dtype.name.lower()):
+            raise ValueError(f"{col} values of {delta_path} do not fit the snapshot's {existing[col].dtype}; "
+                             f"rebuild the snapshot from the CSVs")
+    added = added.astype({col: existing[col].dtype for col in existing.columns
+                          if not isinstance(existing[col].dtype, pd.CategoricalDtype)})
+
+    tables = snapshot.read_tables(directory)
+    new_values = {}
+    for col in derived.SUMMARY_COLUMNS.values():
+        values = derived.distinct(added[col].unique())
+        new_values[col] = values - snapshot.present_values(directory, col, values)
+    snapshot.write_summary(directory, derived.merge_summary(tables['summary'], new_values))
+    snapshot.write_tables(directory, fold(tables, rows, added))
+    snapshot.append_part(directory, added, {os.path.basename(delta_path): len(added)})
+    return len(added)
+
+
+def attach(df, tables):
+    # Register ingested tables on a frame so the helpers use them instead of rebuilding
+    for name, table in tables.items():
+        derived.put(df, name, table)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Fold athlete_events.csv into the dashboard tables in chunks.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--append', metavar='DELTA_CSV', help='append the rows of DELTA_CSV to the snapshot instead')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.append:
+        added = append(args.append, args.directory)
+        print(f"appended {added} rows in {time.perf_counter() - start:.2f}s")
+        raise SystemExit
+    result = ingest(os.path.join(args.directory, 'athlete_events.csv'),
+                    os.path.join(args.directory, 'noc_regions.csv'), args.chunksize)
+    print(f"ingested in {time.perf_counter() - start:.2f}s")
+    for name, table in result.items():
+        print(f"{name}: {len(table) if hasattr(table, '__len__') else ''}")
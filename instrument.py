@@ -0,0 +1,174 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import atomic
+
+# Timers and memory deltas around the hot paths: data loading, preprocess, the
+# helper functions and each dashboard section's data and chart rendering.
+# Every span is
+#   - added to the process-wide totals per (stage, name), which prometheus()
+#     formats as Prometheus text metrics (written to $OLYMPICS_METRICS_FILE by
+#     export(), served by service.py at /metrics),
+#   - logged as one JSON object to the 'olympics.metrics' logger, which writes
+#     to $OLYMPICS_METRICS_LOG when that is set,
+#   - kept in the current run's list after start_run(), for app.py's debug panel.
+# The memory delta is the change in resident set size over the span (pages the
+# span touched and kept, minus pages freed), read from /proc; it is None where
+# there is no /proc. Spans nest: self_seconds is a span's time minus that of the
+# spans inside it, so the self times of a run add up to its instrumented time.
+
+LOG_ENV = 'OLYMPICS_METRICS_LOG'
+METRICS_ENV = 'OLYMPICS_METRICS_FILE'
+PREFIX = 'olympics'
+
+logger = logging.getLogger('olympics.metrics')
+if os.environ.get(LOG_ENV):
+    _handler = logging.FileHandler(os.environ[LOG_ENV])
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_lock = threading.Lock()
+# (stage, name) -> [calls, seconds, max seconds, summed RSS delta in bytes]
+_totals = {}
+# Functions returning [(metric, type, help, [(labels, value)])] of other parts
+# of the app (e.g. prefetch.Prefetcher.metrics), exported with the spans
+_collectors = []
+# Per thread: 'stack' of child seconds of the open spans, 'records' of the current run
+_local = threading.local()
+# Start order of the spans
+_sequence = itertools.count()
+# (pid, fd) of /proc/self/statm, reopened after a fork
+_statm = [None, None]
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss():
+    # Resident set size of this process in bytes, or None without /proc
+    try:
+        if _statm[0] != os.getpid():
+            _statm[:] = [os.getpid(), os.open('/proc/self/statm', os.O_RDONLY)]
+        return int(os.pread(_statm[1], 128, 0).split()[1]) * _PAGE_SIZE
+    except (OSError, AttributeError):
+        return None
+
+
+@contextmanager
+def span(stage, name):
+    stack = _local.__dict__.setdefault('stack', [])
+    depth = len(stack)
+    stack.append(0.0)
+    seq = next(_sequence)
+    before = rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        after = rss()
+        children = stack.pop()
+        if stack:
+            stack[-1] += seconds
+        delta = None if before is None or after is None else after - before
+        _record({'stage': stage, 'name': name, 'seconds': seconds, 'self_seconds': seconds - children,
+                 'rss_delta': delta, 'rss': after, 'depth': depth, 'seq': seq})
+
+
+def timed(stage, name=None):
+    # Decorator: every call of the function is a span
+    def decorate(function):
+        label = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage, label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _record(record):
+    with _lock:
+        totals = _totals.setdefault((record['stage'], record['name']), [0, 0.0, 0.0, 0])
+        totals[0] += 1
+        totals[1] += record['seconds']
+        totals[2] = max(totals[2], record['seconds'])
+        totals[3] += record['rss_delta'] or 0
+    records = getattr(_local, 'records', None)
+    if records is not None:
+        records.append(record)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({'time': time.time(), 'pid': os.getpid(), **record}))
+
+
+def start_run():
+    # Collect this thread's spans from now on (a Streamlit rerun runs in one thread)
+    _local.records = []
+
+
+def run_records():
+    return list(getattr(_local, 'records', None) or [])
+
+
+def breakdown(records):
+    # Rows for a table of the run's spans (nested ones indented) and the self
+    # seconds per stage
+    rows = [{'stage': r['stage'], 'name': '\u2003' * r['depth'] + r['name'], 'ms': r['seconds'] * 1000,
+             'self ms': r['self_seconds'] * 1000,
+             'RSS \u0394 MB': None if r['rss_delta'] is None else r['rss_delta'] / 2**20}
+            for r in sorted(records, key=lambda r: r['seq'])]
+    stages = {}
+    for r in records:
+        stages[r['stage']] = stages.get(r['stage'], 0.0) + r['self_seconds']
+    return rows, stages
+
+
+def register(collector):
+    _collectors.append(collector)
+
+
+def _labels(**labels):
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def prometheus():
+    # The totals in the Prometheus text exposition format
+    with _lock:
+        totals = sorted(_totals.items())
+    metrics = [
+        ('span_calls_total', 'counter', 'Calls of each instrumented span.', 0),
+        ('span_seconds_total', 'counter', 'Wall time spent in each instrumented span.', 1),
+        ('span_seconds_max', 'gauge', 'Longest single call of each instrumented span.', 2),
+        ('span_rss_delta_bytes_sum', 'gauge', 'Summed change of resident memory over each span.', 3),
+    ]
+    lines = []
+    for metric, kind, help_text, i in metrics:
+        lines += [f'# HELP {PREFIX}_{metric} {help_text}', f'# TYPE {PREFIX}_{metric} {kind}']
+        lines += [f'{PREFIX}_{metric}{_labels(stage=stage, name=name)} {values[i]:.9g}'
+                  for (stage, name), values in totals]
+    for collector in list(_collectors):
+        for metric, kind, help_text, samples in collector():
+            lines += [f'# HELP {PREFIX}_{metric} {help_text}', f'# TYPE {PREFIX}_{metric} {kind}']
+            lines += [f'{PREFIX}_{metric}{_labels(**labels)} {value:.9g}' for labels, value in samples]
+    resident = rss()
+    if resident is not None:
+        lines += [f'# HELP {PREFIX}_process_resident_bytes Resident memory of the process.',
+                  f'# TYPE {PREFIX}_process_resident_bytes gauge', f'{PREFIX}_process_resident_bytes {resident}']
+    return '\n'.join(lines) + '\n'
+
+
+def export(path=None):
+    # Write the metrics to `path` (default $OLYMPICS_METRICS_FILE) for a textfile
+    # collector; atomically, so a scrape never sees half a file
+    path = path or os.environ.get(METRICS_ENV)
+    if not path:
+        return None
+    return atomic.write_file(path, prometheus())
@@ -0,0 +1,47 @@
+import weakref
+
+from cache import LRUCache
+
+# Top-athlete leaderboards per Sport and per region, computed once (lazily on
+# first request, or all at once with precompute()) and kept in a bounded LRU.
+# One service exists per preprocessed frame; see helper.leaderboards.
+
+
+class Leaderboards:
+    def __init__(self, df, compute, top_k=15, maxsize=512):
+        # compute(df, n, sport=..., country=...) -> ranked frame, i.e. helper.top_athletes
+        # A weak reference: the service is stored alongside the frame in derived.py
+        # and must not keep it alive
+        self._df = weakref.ref(df)
+        self.compute = compute
+        self.top_k = top_k
+        self.cache = LRUCache(maxsize)
+
+    def _board(self, kind, value, n):
+        if n > self.top_k:
+            # Deeper than what is kept; compute directly
+            return self.compute(self._df(), n, **{kind: value})
+        board = self.cache.get_or_compute((kind, value),
+                                          lambda: self.compute(self._df(), self.top_k, **{kind: value}))
+        return board.head(n).copy()
+
+    def by_sport(self, sport, n=15):
+        return self._board('sport', sport, n)
+
+    def by_country(self, country, n=10):
+        return self._board('country', country, n)
+
+    def precompute(self, sports=None, countries=None):
+        # Fill the cache for every Sport and region (plus 'Overall')
+        df = self._df()
+        if sports is None:
+            sports = ['Overall'] + sorted(df['Sport'].dropna().unique().tolist())
+        if countries is None:
+            countries = sorted(df['region'].dropna().unique().tolist())
+        for sport in sports:
+            self.by_sport(sport)
+        for country in countries:
+            self.by_country(country)
+
+    def stats(self):
+        return self.cache.stats()
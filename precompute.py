@@ -0,0 +1,218 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+import atomic
+import derived
+import helper
+import snapshot
+
+# Builds every per-country and per-sport result the dashboards show, fanned out
+# over a process pool, into one artifact store that the app reads instead of
+# computing them on a user's first visit. The work is partitioned by region
+# (yearwise tally, heatmap cells, top athletes, and the rendered heatmap PNG,
+# which is the slow part) and by Sport (top athletes, Height vs Weight sample),
+# plus one task for the age curves and the events heatmap PNG.
+#
+# The store is precomputed/ under the data directory: one memory-mapped Arrow
+# file per result kind, holding the results of all keys back to back, and a
+# manifest with each key's row range and the data version it was built from.
+# data_loader.load attaches it to the frame while that version is current; the
+# helper functions look results up there first. Heatmap images go to the
+# figure cache (figures.py), which is versioned the same way.
+#
+#   python precompute.py [data_dir] [--workers N] [--no-figures]
+
+STORE_DIR = 'precomputed'
+MANIFEST_FILE = 'manifest.json'
+# Tasks per worker and partition, so uneven keys still keep every worker busy
+TASKS_PER_WORKER = 4
+
+
+def _kinds():
+    # kind -> (partition, compute(df, key))
+    return {
+        'yearwise_medal_tally': ('region', helper.yearwise_medal_tally),
+        'country_event_counts': ('region', helper.country_event_counts),
+        'most_successful_countrywise': ('region', helper.most_successful_countrywise),
+        'most_successful': ('Sport', helper.most_successful),
+        'weight_v_height': ('Sport', helper.weight_v_height),
+        'age_curves': ('all', lambda df, key: helper.age_curves(df)),
+    }
+
+
+def store_dir(directory):
+    return os.path.join(directory, STORE_DIR)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(store_dir(directory), MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class Store:
+    # Read side of the store for one frame. Categorical columns that share the
+    # frame's dtype are stored as codes and get that dtype back on read; the
+    # store keeps the dtypes, not the frame, since it lives in derived.py
+    # alongside it.
+    def __init__(self, directory, manifest, df):
+        self.directory = store_dir(directory)
+        self.manifest = manifest
+        self.dtypes = {col: df[col].dtype for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)}
+        self._tables = {}
+        self.hits = 0
+
+    def _table(self, kind):
+        if kind not in self._tables:
+            self._tables[kind] = snapshot.read_arrow(os.path.join(self.directory, self.manifest['kinds'][kind]['file']))
+        return self._tables[kind]
+
+    def get(self, kind, key):
+        # The stored result, or None when the store doesn't have it
+        entry = self.manifest['kinds'].get(kind)
+        span = entry and entry['keys'].get(str(key))
+        if span is None:
+            return None
+        rows = self._table(kind).iloc[span[0]:span[1]].reset_index(drop=True)
+        for col in entry['codes']:
+            rows[col] = pd.Categorical.from_codes(rows[col].to_numpy(), dtype=self.dtypes[col])
+        self.hits += 1
+        return rows
+
+
+def attach(df, directory):
+    # Attach the store to a loaded frame if it was built from the data version
+    # the frame came from. Cheap enough for every load: a stat while the
+    # store's manifest is unchanged.
+    import data_loader
+
+    try:
+        stat = os.stat(os.path.join(store_dir(directory), MANIFEST_FILE))
+        stamp = (stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        stamp = None
+    if derived.get(df, 'precomputed_stamp', lambda df: None) == stamp:
+        return
+    manifest = read_manifest(directory) if stamp else None
+    fresh = manifest is not None and manifest['version'] == data_loader.version(directory)
+    derived.put(df, 'precomputed', Store(directory, manifest, df) if fresh else None)
+    derived.put(df, 'precomputed_stamp', stamp)
+
+
+def _encode(results, df):
+    # One table for all keys of a kind, and each key's row range
+    frames, keys, start = [], {}, 0
+    for key, frame in results:
+        frames.append(frame.reset_index(drop=True))
+        keys[str(key)] = [start, start + len(frame)]
+        start += len(frame)
+    table = pd.concat(frames, ignore_index=True)
+    codes = [col for col in table.columns
+             if isinstance(table[col].dtype, pd.CategoricalDtype) and col in df.columns and table[col].dtype == df[col].dtype]
+    for col in codes:
+        table[col] = table[col].cat.codes
+    return table, {'keys': keys, 'codes': codes}
+
+
+# Worker state: the frame, loaded once per process
+_df = None
+
+
+def _init(directory):
+    global _df
+
+    import data_loader
+
+    # Figures are cached under the data directory
+    os.environ['OLYMPICS_DATA_DIR'] = directory
+    _df = data_loader.load(directory)
+    # Compute everything afresh, not from an older store
+    derived.put(_df, 'precomputed', None)
+    derived.put(_df, 'precomputed_stamp', object())
+
+
+def _run(partition, keys, version, render):
+    # One task: every kind of `partition` for `keys`; returns the results and the
+    # CPU seconds taken (wall time would also count waiting for a busy core)
+    import figures
+
+    start = time.process_time()
+    results = {kind: [(key, compute(_df, key)) for key in keys]
+               for kind, (part, compute) in _kinds().items() if part == partition}
+    if render and partition == 'region':
+        for key in keys:
+            figures.country_event_heatmap(_df, key, version)
+    elif render and partition == 'all':
+        figures.events_heatmap(_df, version)
+    return results, time.process_time() - start
+
+
+def build(directory, workers=None, render=True):
+    # Returns the manifest written, including the wall seconds and the summed CPU seconds of the tasks
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    import data_loader
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    version = data_loader.version(directory)
+    df = data_loader.load(directory)
+    summary = derived.summary(df)
+    partitions = {'region': summary['countries'], 'Sport': ['Overall'] + summary['sport_list'], 'all': ['Overall']}
+
+    tasks = []
+    for partition, keys in partitions.items():
+        chunks = min(len(keys), workers * TASKS_PER_WORKER)
+        tasks += [(partition, keys[i::chunks], version, render) for i in range(chunks)]
+
+    results = {kind: [] for kind in _kinds()}
+    cpu_seconds = 0.0
+    # spawn: workers must not inherit the parent's threads (pyarrow, a Streamlit server)
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init,
+                             initargs=(directory,)) as pool:
+        for task_results, seconds in pool.map(_run, *zip(*tasks)):
+            cpu_seconds += seconds
+            for kind, pairs in task_results.items():
+                results[kind] += pairs
+
+    out_dir = store_dir(directory)
+    os.makedirs(out_dir, exist_ok=True)
+    kinds = {}
+    for kind, (partition, _) in _kinds().items():
+        order = {key: i for i, key in enumerate(partitions[partition])}
+        table, entry = _encode(sorted(results[kind], key=lambda pair: order[pair[0]]), df)
+        entry['file'] = kind + '.arrow'
+        snapshot.write_arrow(table, os.path.join(out_dir, entry['file']))
+        kinds[kind] = entry
+
+    manifest = {
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'workers': workers,
+        'tasks': len(tasks),
+        'figures': render,
+        'seconds': time.perf_counter() - start,
+        'cpu_seconds': cpu_seconds,
+        'kinds': kinds,
+    }
+    atomic.write_json(os.path.join(out_dir, MANIFEST_FILE), manifest, indent=2)
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Precompute the per-country and per-sport dashboard results.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core)')
+    parser.add_argument('--no-figures', dest='render', action='store_false', help='skip rendering the heatmaps')
+    args = parser.parse_args()
+    manifest = build(args.directory, args.workers, args.render)
+    print(f"{manifest['tasks']} tasks on {manifest['workers']} workers: {manifest['seconds']:.1f}s "
+          f"({manifest['cpu_seconds']:.1f} CPU seconds in the tasks, {manifest['cpu_seconds'] / manifest['seconds']:.2f}x)")
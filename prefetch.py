@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import instrument
+
+# Background prefetching of what the user is likely to look at next. A
+# Prefetcher runs warm(key, cancelled) for scheduled keys in a small thread
+# pool; warm computes the results for a key into the caches the page reads
+# from, and polls cancelled() between steps so superseded work stops early.
+#   - schedule(keys) replaces the pending work: keys no longer wanted are
+#     cancelled (dropped if still queued, stopped at the next step if running)
+#     and at most max_pending keys are queued or running at once.
+#   - Nothing new starts while the process is above max_rss_mb of resident
+#     memory, so prefetching never grows the process past the cap.
+#   - request(key) is called when the page shows a key: a hit if its prefetch
+#     had finished, late if it was still queued or running, a miss otherwise.
+#     Requests also count towards popular().
+# See sections.prefetch_countries for the Country-Wise Analysis page.
+
+# Prefetched keys remembered until they are requested, for the hit rate
+MAX_DONE = 256
+
+
+class Prefetcher:
+    def __init__(self, warm, workers=1, max_pending=6, max_rss_mb=2048, name='prefetch'):
+        self.warm = warm
+        self.max_pending = max_pending
+        self.max_rss_mb = max_rss_mb
+        self.name = name
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.popularity = Counter()
+        # key -> (future, cancel event) of queued and running work
+        self._pending = {}
+        # Keys prefetched and not requested since
+        self._done = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        instrument.register(self.metrics)
+
+    def _over_memory(self):
+        resident = instrument.rss()
+        return self.max_rss_mb is not None and resident is not None and resident > self.max_rss_mb * 2**20
+
+    def _run(self, key, cancel):
+        try:
+            if cancel.is_set():
+                outcome = 'cancelled'
+            elif self._over_memory():
+                outcome = 'skipped_memory'
+            else:
+                with instrument.span('prefetch', self.name):
+                    finished = self.warm(key, cancel.is_set)
+                outcome = 'completed' if finished else 'cancelled'
+        except Exception:
+            outcome = 'errors'
+        with self._lock:
+            self.counts[outcome] += 1
+            if self._pending.get(key, (None, None))[1] is cancel:
+                del self._pending[key]
+            if outcome == 'completed':
+                self._done[key] = True
+                self._done.move_to_end(key)
+                while len(self._done) > MAX_DONE:
+                    self._done.popitem(last=False)
+
+    def schedule(self, keys):
+        # Prefetch keys, most wanted first, in place of whatever is pending
+        with self._lock:
+            candidates = [key for key in dict.fromkeys(keys) if key not in self._done]
+            wanted = candidates[:self.max_pending]
+            for key in [key for key in self._pending if key not in wanted]:
+                future, cancel = self._pending.pop(key)
+                cancel.set()
+                if future.cancel():
+                    self.counts['cancelled'] += 1
+            self.counts['dropped'] += len(candidates) - len(wanted)
+            for key in wanted:
+                if key in self._pending:
+                    continue
+                if self._over_memory():
+                    self.counts['skipped_memory'] += 1
+                    continue
+                cancel = threading.Event()
+                self._pending[key] = (self.pool.submit(self._run, key, cancel), cancel)
+                self.counts['scheduled'] += 1
+
+    def request(self, key):
+        with self._lock:
+            self.popularity[key] += 1
+            if self._done.pop(key, None):
+                self.counts['hits'] += 1
+            elif key in self._pending:
+                self.counts['late'] += 1
+                # Still queued: the page computes it now, so drop the prefetch
+                future, cancel = self._pending[key]
+                if future.cancel():
+                    del self._pending[key]
+                    self.counts['cancelled'] += 1
+            else:
+                self.counts['misses'] += 1
+
+    def popular(self, n):
+        with self._lock:
+            return [key for key, _ in self.popularity.most_common(n)]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            pending = len(self._pending)
+        requests = sum(counts.get(outcome, 0) for outcome in ('hits', 'late', 'misses'))
+        return {**counts, 'pending': pending, 'requests': requests,
+                'hit_rate': counts.get('hits', 0) / requests if requests else 0.0}
+
+    def metrics(self):
+        # Prometheus samples for instrument.prometheus()
+        stats = self.stats()
+        label = {'prefetcher': self.name}
+        return [
+            ('prefetch_requests_total', 'counter', 'Selections shown, by whether their prefetch had finished.',
+             [({**label, 'outcome': outcome}, stats.get(key, 0))
+              for outcome, key in (('hit', 'hits'), ('late', 'late'), ('miss', 'misses'))]),
+            ('prefetch_tasks_total', 'counter', 'Prefetch work by outcome.',
+             [({**label, 'outcome': outcome}, stats.get(outcome, 0))
+              for outcome in ('scheduled', 'completed', 'cancelled', 'dropped', 'skipped_memory', 'errors')]),
+            ('prefetch_pending', 'gauge', 'Prefetches queued or running.', [(label, stats['pending'])]),
+            ('prefetch_hit_ratio', 'gauge', 'Share of selections whose prefetch had finished.',
+             [(label, stats['hit_rate'])]),
+        ]
+
+    def cancel_all(self):
+        self.schedule([])
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=True)
+
+
+def max_rss_mb():
+    # Resident memory cap for prefetching ($OLYMPICS_PREFETCH_MAX_RSS_MB, 0 for none)
+    value = int(os.environ.get('OLYMPICS_PREFETCH_MAX_RSS_MB', '2048'))
+    return value or None
+
+
+def enabled():
+    return os.environ.get('OLYMPICS_PREFETCH', '1') != '0'
@@ -1,6 +1,79 @@
 import pandas as pd
 import numpy as np
+import derived
+import instrument
 
+# Explicit dtypes for the preprocessed frame. Low-cardinality strings become
+# categoricals, the numeric columns get the smallest type that holds them and
+# the one-hot medal columns are always present as bool (get_dummies gives
+# uint8 or bool depending on the pandas version, and omits absent medals).
+CATEGORICAL_COLUMNS = ['Name', 'Sex', 'Team', 'NOC', 'Games', 'Season', 'City', 'Sport', 'Event', 'Medal',
+                       'region', 'notes']
+INTEGER_COLUMNS = {'ID': 'int32', 'Year': 'int16', 'Age': 'Int8', 'Height': 'Int16'}
+FLOAT_COLUMNS = {'Weight': 'float32'}
+MEDAL_COLUMNS = ['Gold', 'Silver', 'Bronze']
+# Integer types from narrowest to widest, for values that do not fit the schema's type
+INTEGER_WIDTHS = ['int8', 'int16', 'int32', 'int64']
+
+
+def fits(values, dtype):
+    info = np.iinfo(dtype)
+    return not len(values) or (info.min <= values.min() and values.max() <= info.max)
+
+
+def to_integer(series, dtype):
+    values = series.to_numpy(dtype='float64', na_value=np.nan)
+    whole = np.isnan(values) | (values == np.round(values))
+    if not whole.all():
+        # Fractional values (e.g. a dataset with decimal heights) - keep them as floats
+        return series.astype('float32')
+    present = values[~np.isnan(values)]
+    # The narrowest type from the schema's up that holds every value (e.g. ages over 127)
+    widths = INTEGER_WIDTHS[INTEGER_WIDTHS.index(dtype.lower()):]
+    width = next((width for width in widths if fits(present, width)), None)
+    if width is None:
+        return series.astype('float64')
+    if len(present) < len(values) or not dtype.islower():
+        # Missing values need the nullable variant (kept where the schema asks for it)
+        width = width.capitalize()
+    return series.astype(width)
+
+
+def apply_schema(df):
+    df = df.copy(deep=False)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col, dtype in INTEGER_COLUMNS.items():
+        if col in df.columns:
+            df[col] = to_integer(df[col], dtype)
+    for col, dtype in FLOAT_COLUMNS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    for col in MEDAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(bool)
+        else:
+            # Not one-hot encoded yet, or no such medal in the data
+            df[col] = (df['Medal'] == col).to_numpy() if 'Medal' in df.columns else False
+    return df
+
+
+def concat(frames):
+    # pd.concat for preprocessed frames: categorical columns stay categorical (with
+    # sorted categories) even when the parts were encoded separately
+    frames = list(frames)
+    columns = {}
+    for col in frames[0].columns:
+        parts = [frame[col] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[col] = pd.Series(pd.api.types.union_categoricals(parts, sort_categories=True))
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+@instrument.timed('preprocess')
 def preprocess(df, region_df):
     # Check if 'Season' column exists
     if 'Season' not in df.columns:
@@ -17,5 +90,14 @@ def preprocess(df, region_df):
 
     # One hot encoding medals
     df = pd.concat([df, pd.get_dummies(df['Medal'])], axis=1)
-    
+
+    # Compact dtypes
+    df = apply_schema(df)
+
+    # Build the shared medal fact tables, the medal cube and the summary once, up front
+    derived.medal_events(df)
+    derived.participation(df)
+    derived.medal_cube(df)
+    derived.summary(df)
+
     return df
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Inverted indexes for equality filters on a table. For each indexed column
+# the row positions of every value are kept in one array grouped by value
+# (ascending within a value) plus the offset where each value's group starts,
+# so the rows of a value are a slice. A filter on several columns intersects
+# those sorted slices, starting from the shortest, and the matching rows are
+# gathered with take(): the cost follows the size of the slices, not of the
+# table. Missing values are in no slice (as with ==). An index holds no
+# reference to the table it was built from.
+
+EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def _postings(series, position_dtype):
+    # (value -> code, positions grouped by code, start offset of each code)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, values = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, values = pd.factorize(series)
+    # A stable sort keeps positions ascending within each value; missing (-1) sort first
+    order = np.argsort(codes, kind='stable').astype(position_dtype)
+    counts = np.bincount(codes[codes >= 0], minlength=len(values))
+    starts = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+    return dict(zip(values.tolist(), range(len(values)))), order, starts
+
+
+def intersect(a, b):
+    # Sorted positions in both a and b (each sorted and unique); a should be the shorter
+    if not len(a) or not len(b):
+        return EMPTY
+    found = np.take(b, np.searchsorted(b, a), mode='clip') == a
+    return a[found]
+
+
+class RowIndex:
+    def __init__(self, frame, columns):
+        self.length = len(frame)
+        position_dtype = np.int32 if self.length < 2**31 else np.int64
+        self._postings = {col: _postings(frame[col], position_dtype) for col in columns}
+
+    def positions(self, col, value):
+        # Rows where col == value, ascending
+        lookup, order, starts = self._postings[col]
+        code = lookup.get(value)
+        if code is None:
+            return EMPTY
+        return order[starts[code]:starts[code + 1]]
+
+    def rows(self, **filters):
+        # Rows matching every col=value filter, ascending; every row without filters
+        if not filters:
+            return np.arange(self.length)
+        lists = sorted((self.positions(col, value) for col, value in filters.items()), key=len)
+        rows = lists[0]
+        for other in lists[1:]:
+            rows = intersect(rows, other)
+        return rows
+
+    def take(self, frame, **filters):
+        # The rows of frame (the table the index was built from) matching the filters
+        return frame.take(self.rows(**filters))
+
+    def values(self, col):
+        return list(self._postings[col][0])
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+from rowindex import RowIndex
+
+# Bounded scatter data for the Height vs Weight plot. The athletes with both
+# measurements are prepared once per frame (Medal with 'No Medal' filled in, a
+# fixed random order); each request then returns either a stratified sample of
+# at most `budget` points or a 2D-binned density, so the payload and the
+# render time do not grow with the dataset. One service exists per
+# preprocessed frame; see helper.scatter_data.
+
+POINT_BUDGET = 5000
+DENSITY_BINS = 60
+# Strata of the sample: every Medal x Sex combination keeps at least a
+# 1 / (MIN_SHARE * number of strata) share of the budget, so rare groups stay visible
+STRATA = ['Medal', 'Sex']
+MIN_SHARE = 4
+
+
+class ScatterData:
+    def __init__(self, athletes, seed=0, maxsize=128):
+        points = athletes[['Sport', 'Sex', 'Weight', 'Height', 'Medal']].dropna(subset=['Weight', 'Height'])
+        points = points.assign(Medal=points['Medal'].cat.add_categories('No Medal').fillna('No Medal'))
+        # Sample order: a seeded random rank per athlete, so samples are stable across reruns
+        self.points = points.reset_index(drop=True)
+        self._rank = np.random.default_rng(seed).permutation(len(self.points))
+        self._index = RowIndex(self.points, ['Sport'])
+        self.cache = LRUCache(maxsize)
+
+    def _rows(self, sport):
+        return self._index.rows() if sport == 'Overall' else self._index.rows(Sport=sport)
+
+    def size(self, sport):
+        return len(self._rows(sport))
+
+    def sample(self, sport, budget=POINT_BUDGET):
+        return self.cache.get_or_compute(('sample', sport, budget), lambda: self._sample(sport, budget))
+
+    def _sample(self, sport, budget):
+        rows = self._rows(sport)
+        if len(rows) <= budget:
+            return self.points.iloc[rows].reset_index(drop=True)
+        strata = self.points.iloc[rows].groupby(STRATA, observed=True).ngroup().to_numpy()
+        sizes = np.bincount(strata)
+        # A floor per stratum, then the rest of the budget in proportion to what is left of each
+        base = np.minimum(sizes, budget // (MIN_SHARE * len(sizes)))
+        left = sizes - base
+        quota = base + (budget - base.sum()) * left // max(left.sum(), 1)
+        # Within each stratum keep the rows with the lowest ranks
+        order = np.lexsort((self._rank[rows], strata))
+        position = np.arange(len(order)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        keep = np.sort(order[position < quota[strata[order]]])
+        return self.points.iloc[rows[keep]].reset_index(drop=True)
+
+    def density(self, sport, bins=DENSITY_BINS):
+        return self.cache.get_or_compute(('density', sport, bins), lambda: self._density(sport, bins))
+
+    def _density(self, sport, bins):
+        # Number of athletes per (Weight, Height) cell and Medal, at the cell centres
+        points = self.points.iloc[self._rows(sport)]
+        weight, height = points['Weight'].to_numpy('float64'), points['Height'].to_numpy('float64')
+        if not len(points):
+            return pd.DataFrame(columns=['Weight', 'Height', 'Medal', 'count'])
+        w_edges = np.linspace(weight.min(), weight.max(), bins + 1)
+        h_edges = np.linspace(height.min(), height.max(), bins + 1)
+        w_bin = np.clip(np.searchsorted(w_edges, weight, side='right') - 1, 0, bins - 1)
+        h_bin = np.clip(np.searchsorted(h_edges, height, side='right') - 1, 0, bins - 1)
+        medal_codes = points['Medal'].cat.codes.to_numpy().astype(np.int64)
+        n_medals = len(points['Medal'].cat.categories)
+        counts = np.bincount((w_bin * bins + h_bin) * n_medals + medal_codes, minlength=bins * bins * n_medals)
+        cells = np.flatnonzero(counts)
+        w_centres = (w_edges[:-1] + w_edges[1:]) / 2
+        h_centres = (h_edges[:-1] + h_edges[1:]) / 2
+        return pd.DataFrame({
+            'Weight': w_centres[cells // n_medals // bins],
+            'Height': h_centres[cells // n_medals % bins],
+            'Medal': pd.Categorical.from_codes(cells % n_medals, dtype=points['Medal'].dtype),
+            'count': counts[cells],
+        })
+
+    def stats(self):
+        return self.cache.stats()
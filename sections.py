@@ -0,0 +1,188 @@
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+import backends
+import data_loader
+import derived
+import figures
+import helper
+import instrument
+import prefetch
+from cache import LRUCache
+
+# Lazy data layer for app.py. Every dashboard section names the datasets it
+# depends on; a dataset is computed the first time a section asks for it (its
+# own dependencies first), memoized for the loaded frame, and never computed
+# for pages nobody opens. While a section's datasets are being computed it
+# shows a placeholder, so the page fills in progressively.
+
+_datasets = {}
+# Countries prefetched around the one shown on the Country-Wise Analysis page:
+# this many on each side of it in the dropdown, and this many of the most viewed
+PREFETCH_NEIGHBOURS = 2
+PREFETCH_POPULAR = 2
+# Menu option -> [(first paint seconds, complete seconds)] of the runs in this process
+timings = {}
+
+
+def dataset(name, *depends):
+    # Register build(*dependency values, *args) as the dataset `name`
+    def register(build):
+        _datasets[name] = (depends, build)
+        return build
+    return register
+
+
+def get(name, *args):
+    df = data_loader.load()
+    if name == 'df':
+        return df
+    depends, build = _datasets[name]
+    memo = derived.get(df, 'sections', lambda df: LRUCache(maxsize=256))
+    return memo.get_or_compute((name, args), lambda: build(*[get(dep) for dep in depends], *args))
+
+
+class PageTimer:
+    # Time from the start of a script run to the first finished section and to the end
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_paint = None
+
+    def painted(self):
+        if self.first_paint is None:
+            self.first_paint = time.perf_counter() - self.start
+
+    def finish(self, page):
+        complete = time.perf_counter() - self.start
+        first_paint = complete if self.first_paint is None else self.first_paint
+        timings.setdefault(page, []).append((first_paint, complete))
+        return first_paint, complete
+
+
+@contextmanager
+def section(timer, *depends, name=None):
+    # Yields a slot to draw the section into followed by the values of its
+    # datasets; a dependency with arguments is given as a tuple (name, *args).
+    # Getting the datasets and drawing are timed as the 'data' and 'render'
+    # spans of the section (see instrument.py), named after its first dataset
+    # unless a name is given.
+    if name is None:
+        name = depends[0][0] if isinstance(depends[0], tuple) else depends[0]
+    slot = st.empty()
+    slot.caption('Loading…')
+    with instrument.span('data', name):
+        values = [get(*dep) if isinstance(dep, tuple) else get(dep) for dep in depends]
+    with instrument.span('render', name):
+        yield (slot, *values)
+    timer.painted()
+
+
+@dataset('version')
+def version():
+    return data_loader.version()
+
+
+@dataset('summary', 'df')
+def summary(df):
+    return derived.summary(df)
+
+
+@dataset('backend', 'df')
+def backend(df):
+    # helper.py, or the SQL backend when $OLYMPICS_BACKEND selects it (see backends.py)
+    return backends.get(df)
+
+
+@dataset('years_countries', 'backend')
+def years_countries(backend):
+    return backend.country_year_list()
+
+
+@dataset('sport_list', 'summary')
+def sport_list(summary):
+    return ['Overall'] + summary['sport_list']
+
+
+@dataset('country_list', 'summary')
+def country_list(summary):
+    return summary['countries']
+
+
+@dataset('medal_tally', 'backend')
+def medal_tally(backend, year, country):
+    return backend.fetch_medal_tally(year, country)
+
+
+@dataset('nations_over_time', 'backend')
+def nations_over_time(backend):
+    return backend.data_over_time('region')
+
+
+@dataset('events_over_time', 'backend')
+def events_over_time(backend):
+    return backend.data_over_time('Event')
+
+
+@dataset('most_successful', 'backend')
+def most_successful(backend, sport):
+    return backend.most_successful(sport)
+
+
+@dataset('yearwise_medal_tally', 'backend')
+def yearwise_medal_tally(backend, country):
+    return backend.yearwise_medal_tally(country)
+
+
+@dataset('most_successful_countrywise', 'backend')
+def most_successful_countrywise(backend, country):
+    return backend.most_successful_countrywise(country)
+
+
+@dataset('age_curves', 'df')
+def age_curves(df):
+    return helper.age_curves(df)
+
+
+@dataset('scatter_data', 'df')
+def scatter_data(df):
+    return helper.scatter_data(df)
+
+
+@dataset('men_vs_women', 'backend')
+def men_vs_women(backend):
+    return backend.men_vs_women()
+
+
+def _warm_country(country, cancelled):
+    # Everything the Country-Wise Analysis page shows for a country, into the
+    # caches the page reads from; False if cancelled part-way
+    steps = [lambda: get('yearwise_medal_tally', country),
+             lambda: get('most_successful_countrywise', country),
+             lambda: figures.country_event_heatmap(get('df'), country, get('version'))]
+    for step in steps:
+        if cancelled():
+            return False
+        step()
+    return True
+
+
+country_prefetcher = prefetch.Prefetcher(_warm_country, max_rss_mb=prefetch.max_rss_mb(), name='countries')
+
+
+def country_viewed(country):
+    # Counts a selection (not every rerun of it) towards the prefetch hit rate and popularity
+    if st.session_state.get('prefetch_country') != country:
+        st.session_state['prefetch_country'] = country
+        country_prefetcher.request(country)
+
+
+def prefetch_countries(country, countries):
+    # Once the page for `country` is drawn: its neighbours in the dropdown
+    # (next first) and the most viewed countries, in place of earlier prefetches
+    i = countries.index(country)
+    near = [countries[j] for step in range(1, PREFETCH_NEIGHBOURS + 1) for j in (i + step, i - step)
+            if 0 <= j < len(countries)]
+    popular = [c for c in country_prefetcher.popular(PREFETCH_POPULAR + 1) if c != country][:PREFETCH_POPULAR]
+    country_prefetcher.schedule(near + popular)
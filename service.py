@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import data_loader
+import derived
+import helper
+import instrument
+from cache import LRUCache
+
+# Local HTTP/JSON service over the helper functions, for tools that need the
+# dashboard numbers without driving the Streamlit UI. Plain asyncio with a
+# minimal HTTP/1.1 implementation (GET only, keep-alive), so it needs nothing
+# beyond the app's own dependencies.
+#
+# The dataset is loaded once and shared by every request. Responses are cached
+# and carry an ETag derived from the dataset version and the request, so
+# clients can revalidate with If-None-Match and get a 304. Aggregations run in
+# a thread pool so the event loop keeps accepting requests while they compute.
+#
+#   python service.py [--host 127.0.0.1] [--port 8050] [--workers 4]
+#
+# Endpoints (query parameters default to 'Overall' where the helper has one):
+#   /medal-tally?year=&country=               helper.fetch_medal_tally
+#   /medal-tally/yearly?country=              helper.yearwise_medal_tally
+#   /top-athletes?sport=&country=&year=&medal=&n=15   helper.top_athletes
+#   /over-time?col=region                     helper.data_over_time
+#   /men-vs-women                             helper.men_vs_women
+#   /summary                                  Top Statistics and dropdown lists
+#   /health                                   dataset version and cache stats
+#   /metrics                                  timings in the Prometheus text format (see instrument.py)
+
+DEFAULT_PORT = 8050
+# How often the dataset version is re-checked (e.g. after an append)
+VERSION_TTL = 1.0
+MAX_HEADER_BYTES = 16384
+
+
+def _records(frame):
+    return json.loads(frame.to_json(orient='records'))
+
+
+ROUTES = {
+    '/medal-tally': lambda df, year='Overall', country='Overall': _records(
+        helper.fetch_medal_tally(df, year, country)),
+    '/medal-tally/yearly': lambda df, country: _records(helper.yearwise_medal_tally(df, country)),
+    '/top-athletes': lambda df, n='15', sport='Overall', country='Overall', year='Overall', medal='Overall': _records(
+        helper.top_athletes(df, int(n), sport, country, year, medal)),
+    '/over-time': lambda df, col='region': _records(helper.data_over_time(df, col)),
+    '/men-vs-women': lambda df: _records(helper.men_vs_women(df)),
+    '/summary': lambda df: derived.summary(df),
+}
+
+
+# Query parameters that must be integers -> the words also accepted
+INTEGER_PARAMS = {'n': (), 'year': ('Overall',)}
+# Query parameters that must be positive integers
+POSITIVE_PARAMS = ['n']
+
+logger = logging.getLogger('olympics.service')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def check_params(path, df, params):
+    # Reject bad query parameters before the helper runs
+    try:
+        inspect.signature(ROUTES[path]).bind(df, **params)
+    except TypeError as exc:
+        raise HTTPError(400, f"bad parameters for {path}: {exc}")
+    for name, words in INTEGER_PARAMS.items():
+        if name not in params or params[name] in words:
+            continue
+        try:
+            value = int(params[name])
+        except ValueError:
+            raise HTTPError(400, f"bad parameters for {path}: {name} must be an integer, not {params[name]!r}")
+        if name in POSITIVE_PARAMS and value <= 0:
+            raise HTTPError(400, f"bad parameters for {path}: {name} must be positive, not {value}")
+    if 'col' in params and params['col'] not in df.columns:
+        raise HTTPError(400, f"bad parameters for {path}: no column {params['col']!r}")
+
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class Service:
+    def __init__(self, directory=None, workers=4, cache_size=1024):
+        self.directory = directory or data_loader.data_dir()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='service')
+        self.cache = LRUCache(cache_size)
+        self.requests = 0
+        self._version = None
+        self._checked = 0.0
+
+    def dataset(self):
+        # The shared frame and its version; data_loader memoizes the frame
+        return data_loader.load(self.directory), self.version()
+
+    def version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked > VERSION_TTL:
+            self._version = data_loader.version(self.directory)
+            self._checked = now
+        return self._version
+
+    def compute(self, path, params):
+        # Runs in the pool
+        if path == '/health':
+            return {'version': self.version(), 'requests': self.requests, 'cache': self.cache.stats()}
+        if path not in ROUTES:
+            raise HTTPError(404, f"no such endpoint: {path}")
+        df, _ = self.dataset()
+        check_params(path, df, params)
+        # Anything the helper raises from here on is a server error (500)
+        return ROUTES[path](df, **params)
+
+    async def respond(self, path, params, if_none_match):
+        # (status, headers, body) for one GET
+        loop = asyncio.get_running_loop()
+        if path == '/metrics':
+            return 200, {'Content-Type': 'text/plain; version=0.0.4', 'Cache-Control': 'no-cache'}, \
+                instrument.prometheus().encode()
+        if path == '/health':
+            body = json.dumps(await loop.run_in_executor(self.pool, self.compute, path, params)).encode()
+            return 200, {'Cache-Control': 'no-cache'}, body
+
+        version = await loop.run_in_executor(self.pool, self.version)
+        key = (version, path, tuple(sorted(params.items())))
+        etag = '"' + hashlib.sha256(repr(key).encode()).hexdigest()[:32] + '"'
+        if if_none_match == etag:
+            return 304, {'ETag': etag}, b''
+        body = self.cache.get(key)
+        if body is None:
+            result = await loop.run_in_executor(self.pool, self.compute, path, params)
+            body = json.dumps(result).encode()
+            self.cache.put(key, body)
+        return 200, {'ETag': etag, 'Cache-Control': 'no-cache'}, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 400, {}, b'{"error": "headers too large"}', close=True)
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, protocol = (lines[0].split(' ') + ['', ''])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                close = headers.get('connection', '').lower() == 'close' or protocol == 'HTTP/1.0'
+                self.requests += 1
+
+                try:
+                    if method != 'GET':
+                        raise HTTPError(405, 'only GET is supported')
+                    url = urlsplit(target)
+                    status, extra, body = await self.respond(url.path.rstrip('/') or '/',
+                                                             dict(parse_qsl(url.query)),
+                                                             headers.get('if-none-match'))
+                except HTTPError as exc:
+                    status, extra, body = exc.status, {}, json.dumps({'error': str(exc)}).encode()
+                except Exception as exc:
+                    logger.exception('%s failed', target)
+                    status, extra, body = 500, {}, json.dumps({'error': repr(exc)}).encode()
+                await self._write(writer, status, extra, body, close)
+                if close:
+                    break
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, extra, body, close=False):
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(body)),
+                   'Connection': 'close' if close else 'keep-alive', **extra}
+        head = f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items()) + '\r\n'
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT):
+        # Load before accepting connections, so the first request doesn't pay for it
+        await asyncio.get_running_loop().run_in_executor(self.pool, self.dataset)
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        print(f"serving on http://{host}:{port}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve the dashboard analytics as JSON over HTTP.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    try:
+        asyncio.run(Service(args.directory, args.workers).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import atomic
+import snapshot
+
+# The preprocessed frame and its derived tables published as raw .npy files
+# under snapshot/shared/, so every process on the host (Streamlit replicas,
+# service workers, precompute jobs) maps the same page-cache pages instead of
+# holding its own copy. attach() builds DataFrames whose columns are read-only
+# views of those mappings: plain columns map directly, categoricals map their
+# codes and nullable integer columns map their values and mask. Nothing is
+# copied, and pandas is kept from consolidating the columns into new blocks.
+#
+# Only the categories are rebuilt in each process. Equal category lists are
+# stored once and turned into one CategoricalDtype per process, so e.g. the
+# athlete names are not held again for every table that has a Name column.
+#
+#   python shared.py [data_dir]     (after `python snapshot.py`, and again after appends)
+
+SHARED_DIR = 'shared'
+MANIFEST_FILE = 'columns.json'
+DATA = 'data'
+
+
+def shared_dir(directory):
+    return os.path.join(snapshot.snapshot_dir(directory), SHARED_DIR)
+
+
+def _snapshot_version(directory):
+    # Ties the published arrays to the snapshot they were made from; every
+    # build and append rewrites the snapshot manifest
+    try:
+        with open(os.path.join(snapshot.snapshot_dir(directory), snapshot.MANIFEST_FILE), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(shared_dir(directory), MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_available(directory):
+    manifest = read_manifest(directory)
+    return manifest is not None and manifest['snapshot'] == _snapshot_version(directory)
+
+
+def _save(out_dir, name, values):
+    path = os.path.join(out_dir, name + '.npy')
+    np.save(path + '.tmp.npy', np.ascontiguousarray(values))
+    os.replace(path + '.tmp.npy', path)
+    return name + '.npy'
+
+
+def _publish_frame(frame, out_dir, prefix, categories):
+    columns = {}
+    for i, col in enumerate(frame.columns):
+        series = frame[col]
+        name = f'{prefix}.{i:02d}'
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = series.cat.categories.tolist()
+            if values not in categories:
+                categories.append(values)
+            columns[col] = {'kind': 'category', 'codes': _save(out_dir, name, series.cat.codes.to_numpy()),
+                            'categories': categories.index(values)}
+        elif series.dtype == object:
+            # Only small tables have these (e.g. participation's regions); they can't be mapped
+            columns[col] = {'kind': 'object', 'values': series.tolist()}
+        elif isinstance(series.array, pd.arrays.IntegerArray):
+            columns[col] = {'kind': 'masked', 'values': _save(out_dir, name, series.array._data),
+                            'mask': _save(out_dir, name + '.mask', series.array._mask)}
+        else:
+            columns[col] = {'kind': 'numpy', 'values': _save(out_dir, name, series.to_numpy())}
+    return columns
+
+
+def publish(df, directory):
+    # The frame plus every snapshot table, laid out as snapshot.write_tables does
+    import derived
+
+    out_dir = shared_dir(directory)
+    os.makedirs(out_dir, exist_ok=True)
+    categories = []
+    frames = {DATA: _publish_frame(df, out_dir, DATA, categories)}
+    for name, index in snapshot.TABLES.items():
+        table = getattr(derived, name)(df)
+        table = table['region_year'] if name == 'medal_cube' else table
+        frames[name] = _publish_frame(table.reset_index() if index else table, out_dir, name, categories)
+    manifest = {'snapshot': _snapshot_version(directory), 'rows': len(df), 'categories': categories,
+                'frames': frames}
+    atomic.write_json(os.path.join(out_dir, MANIFEST_FILE), manifest)
+    return out_dir
+
+
+def attach(directory):
+    # Read-only DataFrame over the published arrays, with the derived tables
+    # attached the way snapshot.read attaches them
+    import derived
+
+    in_dir = shared_dir(directory)
+    manifest = read_manifest(directory)
+    dtypes = [pd.CategoricalDtype(values) for values in manifest['categories']]
+
+    def load(name):
+        # A plain ndarray view, so np.memmap semantics don't leak into results
+        return np.load(os.path.join(in_dir, name), mmap_mode='r').view(np.ndarray)
+
+    def frame(columns):
+        arrays = {}
+        for col, spec in columns.items():
+            if spec['kind'] == 'category':
+                arrays[col] = pd.Categorical.from_codes(load(spec['codes']), dtype=dtypes[spec['categories']],
+                                                        validate=False)
+            elif spec['kind'] == 'masked':
+                arrays[col] = pd.arrays.IntegerArray(load(spec['values']), load(spec['mask']))
+            elif spec['kind'] == 'object':
+                arrays[col] = np.array(spec['values'], dtype=object)
+            else:
+                arrays[col] = load(spec['values'])
+        return pd.DataFrame(arrays, copy=False)
+
+    df = frame(manifest['frames'][DATA])
+    for name, index in snapshot.TABLES.items():
+        table = frame(manifest['frames'][name])
+        if index:
+            # In place, since a returned frame would be a private copy of every column
+            table.set_index(index, inplace=True)
+        derived.put(df, name, derived.rollup_medal_cube(table) if name == 'medal_cube' else table)
+    if os.path.exists(os.path.join(snapshot.snapshot_dir(directory), snapshot.SUMMARY_FILE)):
+        derived.put(df, 'summary', snapshot.read_summary(directory))
+    return df
+
+
+def build(directory):
+    return publish(snapshot.read(directory), directory)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Publish the snapshot as memory-mappable arrays for all processes.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    args = parser.parse_args()
+    print(build(args.directory))
@@ -0,0 +1,235 @@
+import json
+import os
+import time
+
+import atomic
+
+# Columnar snapshot of the preprocessed athlete events, stored as uncompressed
+# Arrow IPC (Feather v2) files so it can be memory-mapped instead of re-parsing
+# and re-preprocessing the CSVs on every cold start. The rows live in one or
+# more part files (ingest.append adds a part per new edition) and the derived
+# tables from derived.py are stored next to them, so loading rebuilds nothing.
+
+# Bump whenever preprocessor.preprocess or the derived tables change the columns
+# or dtypes they produce; snapshots written with another version are ignored
+# and the CSV path is used.
+SCHEMA_VERSION = 5
+
+SNAPSHOT_DIR = 'snapshot'
+DATA_FILE = 'athlete_events.arrow'
+MANIFEST_FILE = 'manifest.json'
+SUMMARY_FILE = 'summary.json'
+
+# Persisted derived tables and the columns that form their index
+TABLES = {
+    'medal_events': ['region', 'Year', 'Sport'],
+    'participation': None,
+    'athlete_medals': None,
+    'athletes': ['ID'],
+    'year_counts': None,
+    'medal_cube': ['region', 'Year'],
+}
+
+
+def snapshot_dir(directory):
+    return os.path.join(directory, SNAPSHOT_DIR)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(snapshot_dir(directory), MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    atomic.write_json(os.path.join(snapshot_dir(directory), MANIFEST_FILE), manifest, indent=2)
+
+
+def is_available(directory):
+    manifest = read_manifest(directory)
+    return (manifest is not None
+            and manifest.get('schema_version') == SCHEMA_VERSION
+            and all(os.path.exists(os.path.join(snapshot_dir(directory), part)) for part in manifest['parts'])
+            and not is_stale(directory, manifest))
+
+
+def is_stale(directory, manifest):
+    # True when a source CSV in the directory is no longer the one the snapshot
+    # was built from (e.g. a new athlete_events.csv was dropped in); the CSVs are
+    # then loaded instead, as the app did before snapshots. Parts added by
+    # ingest.append are not CSVs of the directory and are not checked.
+    import data_loader
+
+    for name in (data_loader.ATHLETE_EVENTS_FILE, data_loader.REGIONS_FILE):
+        path = os.path.join(directory, name)
+        if name in manifest.get('sources', {}) and os.path.exists(path) \
+                and data_loader.file_hash(path) != manifest['sources'][name]:
+            return True
+    return False
+
+
+def write_arrow(df, path):
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    # Keep NaN as NaN rather than Arrow nulls: float columns then map straight
+    # back to numpy without a copy when the file is read memory-mapped.
+    df = df.reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for col in df.columns:
+        if df[col].dtype.kind == 'f':
+            i = table.schema.get_field_index(col)
+            table = table.set_column(i, table.field(i), pa.array(df[col].to_numpy(), from_pandas=False))
+    tmp_path = path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+def open_arrow(path):
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def read_arrow(path):
+    # The returned frame's numeric columns are views into the mapped file where
+    # Arrow allows it (no nulls, plain dtypes); everything else is converted once.
+    return open_arrow(path).to_pandas(split_blocks=True)
+
+
+def read_summary(directory):
+    with open(os.path.join(snapshot_dir(directory), SUMMARY_FILE)) as f:
+        return json.load(f)
+
+
+def write_summary(directory, summary):
+    atomic.write_json(os.path.join(snapshot_dir(directory), SUMMARY_FILE), summary)
+
+
+def write_tables(directory, tables):
+    for name, index in TABLES.items():
+        table = tables[name]['region_year'] if name == 'medal_cube' else tables[name]
+        write_arrow(table.reset_index() if index else table, os.path.join(snapshot_dir(directory), name + '.arrow'))
+
+
+def read_tables(directory):
+    import derived
+
+    tables = {}
+    for name, index in TABLES.items():
+        path = os.path.join(snapshot_dir(directory), name + '.arrow')
+        if not os.path.exists(path):
+            continue
+        table = read_arrow(path)
+        if index:
+            table = table.set_index(index)
+        tables[name] = derived.rollup_medal_cube(table) if name == 'medal_cube' else table
+    if os.path.exists(os.path.join(snapshot_dir(directory), SUMMARY_FILE)):
+        tables['summary'] = read_summary(directory)
+    return tables
+
+
+def write(df, directory, sources=None):
+    import derived
+
+    out_dir = snapshot_dir(directory)
+    os.makedirs(out_dir, exist_ok=True)
+
+    data_path = os.path.join(out_dir, DATA_FILE)
+    write_arrow(df, data_path)
+    write_tables(directory, {name: getattr(derived, name)(df) for name in TABLES})
+    write_summary(directory, derived.summary(df))
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'parts': [DATA_FILE],
+        'rows': len(df),
+        'columns': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'sources': sources or {},
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    _write_manifest(directory, manifest)
+    return data_path
+
+
+def append_part(directory, rows, source=None):
+    # Add already-preprocessed rows as a new part; the existing parts are untouched
+    manifest = read_manifest(directory)
+    part = 'athlete_events.%04d.arrow' % len(manifest['parts'])
+    write_arrow(rows, os.path.join(snapshot_dir(directory), part))
+    manifest['parts'].append(part)
+    manifest['rows'] += len(rows)
+    if source:
+        manifest['sources'][part] = source
+    manifest['updated'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    _write_manifest(directory, manifest)
+    return part
+
+
+def _is_in(table, column, values):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    col = table.column(column)
+    if pa.types.is_dictionary(col.type):
+        col = col.cast(col.type.value_type)
+    return col, pc.is_in(col, value_set=pa.array(list(values), type=col.type))
+
+
+def read_rows(directory, column, values):
+    # Rows whose `column` is one of `values`, converting only the matching rows
+    # of each memory-mapped part
+    import preprocessor
+
+    frames = []
+    for part in read_manifest(directory)['parts']:
+        table = open_arrow(os.path.join(snapshot_dir(directory), part))
+        frames.append(table.filter(_is_in(table, column, values)[1]).to_pandas())
+    return preprocessor.concat(frames)
+
+
+def present_values(directory, column, values):
+    # Which of `values` (None for missing) occur in `column` of the stored rows,
+    # reading that one column of each part
+    import pyarrow.compute as pc
+
+    present = set()
+    for part in read_manifest(directory)['parts']:
+        table = open_arrow(os.path.join(snapshot_dir(directory), part))
+        col, mask = _is_in(table, column, values - {None})
+        present.update(pc.unique(col.filter(mask)).to_pylist())
+        if None in values and col.null_count:
+            present.add(None)
+    return present
+
+
+def read(directory):
+    import derived
+    import preprocessor
+
+    manifest = read_manifest(directory)
+    parts = [read_arrow(os.path.join(snapshot_dir(directory), part)) for part in manifest['parts']]
+    df = parts[0] if len(parts) == 1 else preprocessor.concat(parts)
+    for name, table in read_tables(directory).items():
+        derived.put(df, name, table)
+    return df
+
+
+def build(directory):
+    import data_loader
+
+    df = data_loader.load_csv(directory)
+    athlete_hash, region_hash = data_loader.fetch_all(directory)
+    sources = {data_loader.ATHLETE_EVENTS_FILE: athlete_hash, data_loader.REGIONS_FILE: region_hash}
+    return write(df, directory, sources)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the preprocessed Arrow snapshot used by the app.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    args = parser.parse_args()
+    print(build(args.directory))
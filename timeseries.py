@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Distinct-count-per-Year engine behind the over-time line charts. Every
+# (Year, segment value, column value) triple is packed into one int64 code and
+# deduplicated in a single pass (a bitmap, or a hash table when the code space
+# is large), for any number of columns and segments.
+# The result is a tidy frame with one row per (Year, series, segment, group):
+#   series  - the column whose distinct values are counted (e.g. 'region')
+#   segment - the column the rows are split by (e.g. 'Sex'), 'All' for no split
+#   group   - the segment's value (e.g. 'F'), 'All' for no split
+# Missing values count as one distinct value, as drop_duplicates does.
+
+TIDY_COLUMNS = ['Year', 'series', 'segment', 'group', 'count']
+ALL = 'All'
+
+
+def _group_codes(series):
+    # Dense integer codes (missing values included) and the value of each code
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int64) + 1
+        return codes, np.concatenate([[np.nan], series.cat.categories.to_numpy(dtype=object)])
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return codes.astype(np.int64), np.asarray(uniques, dtype=object)
+
+
+def _key_codes(series):
+    # Integer codes of the counted column and their upper bound; the values
+    # themselves are never needed, so integer columns are only shifted
+    if series.dtype.kind in 'iu' and len(series):
+        missing = series.isna().to_numpy()
+        values = series.to_numpy(dtype=np.int64, na_value=0)
+        if not missing.any():
+            low = values.min()
+            return values - low, int(values.max() - low) + 1
+        if missing.all():
+            return np.zeros(len(values), dtype=np.int64), 1
+        # Nullable integers: missing values get the code after the largest value
+        present = values[~missing]
+        low, high = present.min(), present.max()
+        return np.where(missing, high - low + 1, values - low), int(high - low) + 2
+    codes, _ = _group_codes(series)
+    return codes, int(codes.max()) + 1 if len(codes) else 1
+
+
+def _unique(codes, size):
+    # Distinct values of non-negative codes below `size`: a bitmap when that
+    # stays within a few bytes per row, a hash table otherwise
+    if size <= 8 * len(codes) + (1 << 20):
+        seen = np.zeros(size, dtype=bool)
+        seen[codes] = True
+        return np.flatnonzero(seen)
+    return pd.unique(codes)
+
+
+def distinct_per_year(df, columns, segments=(), overall=True):
+    # Tidy distinct counts of every column in `columns` per Year, unsplit
+    # (overall) and split by each column in `segments`
+    year_codes, years = pd.factorize(df['Year'], sort=True)
+    year_codes = year_codes.astype(np.int64)
+    splits = [(ALL, np.zeros(len(df), dtype=np.int64), np.array([ALL], dtype=object))] if overall else []
+    splits += [(segment,) + _group_codes(df[segment]) for segment in segments]
+
+    frames = []
+    for col in columns:
+        key_codes, n_keys = _key_codes(df[col])
+        for segment, group_codes, groups in splits:
+            # (Year, group) cell of every row, then the cell of every distinct (cell, key) code
+            n_cells = len(years) * len(groups)
+            cells = year_codes * len(groups) + group_codes
+            distinct = _unique(cells * n_keys + key_codes, n_cells * n_keys) // n_keys
+            counts = np.bincount(distinct, minlength=n_cells)
+            present = np.flatnonzero(counts)
+            frames.append(pd.DataFrame({
+                'Year': years[present // len(groups)],
+                'series': col,
+                'segment': segment,
+                'group': groups[present % len(groups)],
+                'count': counts[present].astype(np.int64),
+            }))
+    if not frames:
+        return pd.DataFrame(columns=TIDY_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def series(tidy, col, segment=ALL):
+    # One series of a tidy frame as Year -> count per group (a single 'All'
+    # column when unsegmented), sorted by Year
+    rows = tidy[(tidy['series'] == col) & (tidy['segment'] == segment)]
+    return rows.pivot(index='Year', columns='group', values='count').sort_index()
@@ -0,0 +1,50 @@
+import compileall
+import os
+
+import data_loader
+import precompute
+import shared
+import snapshot
+
+# Warm-start artifacts for a cold container, built once when the image or the
+# data volume is prepared so that the first run of the app neither parses nor
+# preprocesses the CSVs:
+#   1. bytecode of the app's modules (a read-only image would otherwise
+#      compile them again on every start),
+#   2. the snapshot (snapshot.py), which load() memory-maps instead of running
+#      preprocess,
+#   3. the shared arrays (shared.py), which every process maps without copying,
+#   4. with --precompute, the per-country and per-sport results (precompute.py).
+# load() picks up whatever is there and current; nothing here changes results.
+#
+#   python warmstart.py [data_dir] [--precompute] [--workers N]
+
+
+def status(directory):
+    # Which artifacts a start from `directory` would use
+    manifest = precompute.read_manifest(directory)
+    return {
+        'snapshot': snapshot.is_available(directory),
+        'shared': shared.is_available(directory),
+        'precomputed': manifest is not None and manifest['version'] == data_loader.version(directory),
+    }
+
+
+def build(directory, precomputed=False, workers=None):
+    compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), maxlevels=0, quiet=1)
+    snapshot.build(directory)
+    shared.build(directory)
+    if precomputed:
+        precompute.build(directory, workers)
+    return status(directory)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the warm-start artifacts the app loads on a cold start.')
+    parser.add_argument('directory', nargs='?', default=os.environ.get('OLYMPICS_DATA_DIR', '.'))
+    parser.add_argument('--precompute', action='store_true', help='also precompute per-country and per-sport results')
+    parser.add_argument('--workers', type=int, default=None, help='precompute processes (default: one per core)')
+    args = parser.parse_args()
+    print(build(args.directory, args.precompute, args.workers))